@@ -1,17 +1,27 @@
 import gradio as gr
-import subprocess
 import os
-import tempfile
-import shutil
+import hmac
 import json
 import re
 import time
-from collections import defaultdict
+import uuid
+import queue
+import asyncio
+import threading
+from collections import defaultdict, OrderedDict, deque
 from fastapi import FastAPI, Request, HTTPException, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import List, Callable
+from typing import List, Optional
+from git_mirror import GitMirrorCache
+from status_store import create_status_store
+from modal_status import ModalStatusCache
+from modal_backend import create_backend
+from rate_limit import RateLimiter, create_rate_limit_store, RATE_LIMIT_ROUTES
+from request_policy import RequestPolicyMiddleware
+from metrics import MetricsRegistry, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, DURATION_BUCKETS
+from request_timing import ServerTimingMiddleware
+from performance_profiles import DEFAULT_PROFILE, load_profiles, resolve_profile, profile_env
 
 # Modal token and secret (replace with environment variables in production)
 MODAL_TOKEN_ID = os.environ.get("MODAL_TOKEN_ID", "ak-VPIrJKnuj04h8zpLJrkMdB")
@@ -25,149 +35,55 @@ ALLOWED_DOMAINS = [
     "buddymaster77hugs-gradiodocker.hf.space"
 ]
 
+# Bearer token for scraping /metrics server-side; without it /metrics is only
+# reachable through the same domain policy as every other route
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 # Create the FastAPI app
 app = FastAPI()
 
-# Rate limiting middleware
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_limit=30, time_window=60):
-        super().__init__(app)
-        self.requests = defaultdict(list)
-        self.requests_limit = requests_limit
-        self.time_window = time_window
-        
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host
-        
-        # Clean old requests
-        current_time = time.time()
-        self.requests[client_ip] = [req_time for req_time in self.requests[client_ip] 
-                                   if current_time - req_time < self.time_window]
-        
-        # Check if rate limit exceeded
-        if len(self.requests[client_ip]) >= self.requests_limit:
-            return JSONResponse(
-                status_code=429,
-                content={"error": "Too many requests", "message": "Rate limit exceeded. Try again later."}
-            )
-            
-        # Add current request time
-        self.requests[client_ip].append(current_time)
-        
-        # Process request
-        response = await call_next(request)
-        return response
-
-# Custom domain restriction middleware class
-class DomainRestrictionMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, allowed_domains: List[str]):
-        super().__init__(app)
-        self.allowed_domains = allowed_domains
-
-    async def dispatch(self, request: Request, call_next):
-        # Get origin and referer headers
-        origin = request.headers.get("Origin", "")
-        referer = request.headers.get("Referer", "")
-        
-        # Extract domains from headers
-        origin_domain = self._extract_domain(origin) if origin else ""
-        referer_domain = self._extract_domain(referer) if referer else ""
-        
-        # For command-line tools like curl, these might be empty or spoofed
-        # Block if not from allowed domains (no exceptions for development)
-        if origin_domain not in self.allowed_domains and referer_domain not in self.allowed_domains:
-            # Log attempted access for monitoring
-            print(f"Access denied: Origin: {origin}, Referer: {referer}, IP: {request.client.host}")
-            
-            return JSONResponse(
-                status_code=403,
-                content={
-                    "error": "Access denied",
-                    "message": "This service can only be accessed from authorized domains."
-                }
-            )
-        
-        # If allowed, proceed with the request
-        response = await call_next(request)
-        return response
-    
-    def _extract_domain(self, url: str) -> str:
-        """Extract the domain from a URL without protocol, path, or port."""
-        if not url:
-            return ""
-            
-        # Remove protocol
-        if "://" in url:
-            url = url.split("://")[1]
-        
-        # Remove path and query parameters
-        if "/" in url:
-            url = url.split("/")[0]
-            
-        # Remove port if present
-        if ":" in url:
-            url = url.split(":")[0]
-            
-        return url
-
-# Anti-automation middleware to block common API clients
-class AntiAutomationMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Skip check for OPTIONS requests (CORS preflight)
-        if request.method == "OPTIONS":
-            return await call_next(request)
-        
-        # Check for common API client user agents
-        user_agent = request.headers.get("User-Agent", "").lower()
-        
-        # Block common automation tools
-        blocked_agents = ["curl", "wget", "postman", "insomnia", "python-requests", "httpie"]
-        if any(agent in user_agent for agent in blocked_agents):
-            return JSONResponse(
-                status_code=403,
-                content={"error": "Access denied", "message": "API client tools not allowed"}
-            )
-            
-        # Additional header checks
-        # Legitimate browsers typically send these headers
-        if not request.headers.get("Accept-Language") and not request.headers.get("Accept"):
-            return JSONResponse(
-                status_code=403,
-                content={"error": "Access denied", "message": "Missing required headers"}
-            )
-            
-        # Proceed with the request
-        response = await call_next(request)
-        return response
-
-# Security headers middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Content-Security-Policy"] = "default-src 'self'; connect-src *; script-src 'self' 'unsafe-inline' 'unsafe-eval'; style-src 'self' 'unsafe-inline'"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Referrer-Policy"] = "same-origin"
-        
-        return response
+# Prometheus-style metrics served at /metrics (see metrics.py)
+metrics = MetricsRegistry()
+policy_rejections = metrics.counter(
+    "http_policy_rejections_total", "Requests rejected by the request policy", ("check", "status")
+)
+deploy_duration = metrics.histogram(
+    "deploy_duration_seconds", "Time to run a deploy or undeploy", ("operation", "outcome"),
+    buckets=DURATION_BUCKETS
+)
 
-# Add middlewares in the correct order
-app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(RateLimitMiddleware, requests_limit=30, time_window=60)  # 30 requests per minute
-app.add_middleware(AntiAutomationMiddleware)
+# Single pure-ASGI policy layer: domain restriction, anti-automation checks,
+# rate limiting, security headers and CORS (see request_policy.py)
 app.add_middleware(
-    DomainRestrictionMiddleware, 
-    allowed_domains=ALLOWED_DOMAINS
+    RequestPolicyMiddleware,
+    allowed_domains=ALLOWED_DOMAINS,
+    rate_limiter=RateLimiter(
+        requests_limit=30, time_window=60,  # 30 requests per minute
+        route_limits=RATE_LIMIT_ROUTES,
+        store=create_rate_limit_store()  # Shared across workers when RATE_LIMIT_DB is set
+    ),
+    rejections=policy_rejections,
+    exempt_paths=("/metrics",) if METRICS_TOKEN else ()
 )
+# Rejected requests are counted too
+app.add_middleware(MetricsMiddleware, registry=metrics, prefix="http")
+
+# Requests at least this slow (milliseconds) are logged with their phase timings
+REQUEST_LOG_SLOW_MS = float(os.environ.get("REQUEST_LOG_SLOW_MS", "1000"))
+
+def log_slow_request(record):
+    if record["total_ms"] >= REQUEST_LOG_SLOW_MS:
+        print(json.dumps(dict(record, event="slow_request")))
+
+# Outermost: request IDs plus Server-Timing for the policy and endpoint phases
+app.add_middleware(ServerTimingMiddleware, on_complete=log_slow_request)
 
 # Create data models for the requests
 class DeployRequest(BaseModel):
     repo_url: str
     modal_name: str = "default_app"  # Default value if not provided
+    ref: Optional[str] = None  # Branch, tag or commit to deploy (default: remote HEAD)
+    profile: str = DEFAULT_PROFILE  # Performance profile (see /api/profiles)
 
 class StatusRequest(BaseModel):
     modal_name: str
@@ -175,107 +91,235 @@ class StatusRequest(BaseModel):
 class UndeployRequest(BaseModel):
     modal_name: str
 
-# Dictionary to store deployment status
-deployment_status = {}
+class BatchRequest(BaseModel):
+    modal_names: List[str]
+    parallelism: int = 4  # Maximum number of this batch's jobs queued or running at the same time
+    ref: Optional[str] = None  # Only used by batch deploy
+    profile: str = DEFAULT_PROFILE  # Only used by batch deploy
+
+# Deployment status per app, persisted in the configured status store
+# (SQLite by default; see status_store.py)
+deployment_status = create_status_store()
 
-# Helper function to set environment variables for Modal
-def get_modal_env(modal_name):
+# Number of output lines kept per app (override with LOG_BUFFER_LINES)
+LOG_BUFFER_LINES = int(os.environ.get("LOG_BUFFER_LINES", "1000"))
+
+# Wake asyncio futures registered as (loop, future) from any thread, so
+# async handlers can wait on worker threads without holding an executor thread
+def wake_async_waiters(waiters):
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(_resolve_waiter, future)
+        except RuntimeError:
+            # The waiter's event loop has already been closed
+            pass
+
+def _resolve_waiter(future):
+    if not future.done():
+        future.set_result(None)
+
+# Bounded per-app ring buffers of deploy/undeploy output that readers can follow live
+class LogHub:
+    def __init__(self, max_lines=1000):
+        self.max_lines = max_lines
+        self.buffers = {}
+        self.next_seq = defaultdict(int)
+        self.active = set()
+        self.condition = threading.Condition()
+        # Async readers per app, woken on every new line and when the operation ends
+        self.async_waiters = defaultdict(list)
+
+    def begin(self, modal_name, header):
+        # Mark an operation as running and return the sequence number it starts at
+        with self.condition:
+            self.active.add(modal_name)
+            start = self.next_seq[modal_name]
+        self.append(modal_name, header)
+        return start
+
+    def append(self, modal_name, line):
+        with self.condition:
+            buffer = self.buffers.get(modal_name)
+            if buffer is None:
+                buffer = self.buffers[modal_name] = deque(maxlen=self.max_lines)
+            buffer.append((self.next_seq[modal_name], line))
+            self.next_seq[modal_name] += 1
+            self.condition.notify_all()
+            wake_async_waiters(self.async_waiters.pop(modal_name, ()))
+
+    def end(self, modal_name):
+        with self.condition:
+            self.active.discard(modal_name)
+            self.condition.notify_all()
+            wake_async_waiters(self.async_waiters.pop(modal_name, ()))
+
+    def lines_since(self, modal_name, since=0):
+        with self.condition:
+            return [(seq, line) for seq, line in self.buffers.get(modal_name, ()) if seq >= since]
+
+    def text_since(self, modal_name, since=0):
+        return "\n".join(line for _, line in self.lines_since(modal_name, since))
+
+    def wait(self, modal_name, since, timeout):
+        # Block until lines newer than since exist or the timeout expires.
+        # Returns (lines, still_active).
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.next_seq[modal_name] > since or modal_name not in self.active,
+                timeout
+            )
+            return self.lines_since(modal_name, since), modal_name in self.active
+
+    async def wait_async(self, modal_name, since, timeout):
+        # Same as wait() for coroutines: parks on a future instead of a thread
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.condition:
+            if self.next_seq[modal_name] > since or modal_name not in self.active:
+                return self.lines_since(modal_name, since), modal_name in self.active
+            self.async_waiters[modal_name].append((loop, future))
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        finally:
+            with self.condition:
+                waiters = self.async_waiters.get(modal_name)
+                if waiters and (loop, future) in waiters:
+                    waiters.remove((loop, future))
+                    if not waiters:
+                        del self.async_waiters[modal_name]
+        with self.condition:
+            return self.lines_since(modal_name, since), modal_name in self.active
+
+operation_logs = LogHub(max_lines=LOG_BUFFER_LINES)
+
+# Callback that feeds an operation's output into the app's log buffer line by line
+def log_to(modal_name):
+    def on_line(line):
+        # Carriage returns from progress spinners would break SSE framing
+        operation_logs.append(modal_name, line.replace("\r", ""))
+    return on_line
+
+# Timestamp in the same format as the `date` command
+def timestamp():
+    return time.strftime("%a %b %d %H:%M:%S %Z %Y")
+
+# Per-app locks so operations on the same modal_name never overlap, while
+# different apps deploy in parallel
+app_locks = defaultdict(threading.Lock)
+app_locks_guard = threading.Lock()
+
+def app_lock(modal_name):
+    with app_locks_guard:
+        return app_locks[modal_name]
+
+# Named CPU/memory/scaling profiles for the deployed web_app, validated at
+# start-up (built-ins plus any in PERFORMANCE_PROFILES; see performance_profiles.py)
+PERFORMANCE_PROFILES = load_profiles()
+
+# Helper function to set environment variables for Modal; a deploy's
+# performance profile is passed on to modal_container.py
+def get_modal_env(modal_name, profile=None):
     env = os.environ.copy()
     env["MODAL_APP_NAME"] = modal_name
     env["MODAL_TOKEN_ID"] = MODAL_TOKEN_ID
     env["MODAL_TOKEN_SECRET"] = MODAL_TOKEN_SECRET
+    if profile is not None:
+        env.update(profile_env(profile))
     return env
 
+# Backend that runs modal operations (MODAL_BACKEND=cli|worker|fake, see modal_backend.py)
+modal_backend = create_backend(env_factory=get_modal_env)
+
+# Cached, coalesced status lookups for apps this service has no record of
+modal_status = ModalStatusCache(modal_backend)
+modal_status.start()
+
 # Function to handle deployment
 # Add this constant at the top of your file with the other constants
 HARDCODED_REPO_URL = "https://github.com/Bharani77/Modal.git"
 
+# Local mirror cache so deploys check out a worktree instead of cloning
+git_cache = GitMirrorCache()
+
 # Modify the deploy_modal function to use the hardcoded URL
-def deploy_modal(repo_url, modal_name="default_app"):
+def deploy_modal(repo_url, modal_name="default_app", ref=None, profile=DEFAULT_PROFILE):
+    with app_lock(modal_name):
+        return _deploy_modal(repo_url, modal_name, ref, profile)
+
+def _deploy_modal(repo_url, modal_name, ref, profile):
     # Use hardcoded repo URL instead of the one provided in the UI
     repo_url = HARDCODED_REPO_URL
     
     # Update status to "in_progress"
     deployment_status[modal_name] = {"status": "in_progress", "details": "Deployment started"}
+    log_start = operation_logs.begin(modal_name, f"=== Deploying {modal_name} from {repo_url} ===")
     
-    # Create a temporary directory for the operation
-    temp_dir = tempfile.mkdtemp()
-    original_dir = os.getcwd()
+    worktree = None
+    started = time.monotonic()
+    outcome = "error"
     
     try:
-        # Clone the repository using hardcoded URL
-        clone_process = subprocess.run(
-            ["git", "clone", repo_url, temp_dir],
-            capture_output=True, text=True, check=True
-        )
+        settings = resolve_profile(profile, PERFORMANCE_PROFILES)
         
-        # Rest of the function remains the same
-        os.chdir(temp_dir)
-        env = get_modal_env(modal_name)
+        # Check out the requested commit from the local mirror of the hardcoded URL
+        worktree, commit = git_cache.checkout(repo_url, ref)
         
-        deploy_process = subprocess.run(
-            ["modal", "deploy", "modal_container.py"],
-            capture_output=True, text=True,
-            env=env
+        # Run modal inside the job's own worktree; the process cwd is never changed
+        returncode, _, _ = modal_backend.deploy(
+            modal_name, worktree, on_line=log_to(modal_name), env=get_modal_env(modal_name, settings)
         )
+        output = operation_logs.text_since(modal_name, log_start)
         
-        if deploy_process.returncode == 0:
-            result = f"Deployment successful!\n\nOutput:\n{deploy_process.stdout}\n\nDeployed with MODAL_NAME: {modal_name}\nUsed repository: {repo_url}"
+        # Full output lives in the bounded log buffer; the status keeps a summary
+        outcome = "success" if returncode == 0 else "failure"
+        if returncode == 0:
+            result = f"Deployment successful!\n\nOutput:\n{output}\n\nDeployed with MODAL_NAME: {modal_name}\nUsed repository: {repo_url}\nCommit: {commit}\nPerformance profile: {profile}"
             deployment_status[modal_name] = {
                 "status": "deployed",
-                "details": result,
-                "stdout": deploy_process.stdout,
-                "deployed_at": subprocess.check_output(["date"]).decode().strip(),
-                "repo_url": repo_url
+                "details": "Deployment successful",
+                "deployed_at": timestamp(),
+                "repo_url": repo_url,
+                "commit": commit,
+                "profile": profile
             }
         else:
-            result = f"Deployment failed.\n\nError:\n{deploy_process.stderr}\n\nOutput:\n{deploy_process.stdout}\n\nAttempted with MODAL_NAME: {modal_name}\nUsed repository: {repo_url}"
+            result = f"Deployment failed.\n\nOutput:\n{output}\n\nAttempted with MODAL_NAME: {modal_name}\nUsed repository: {repo_url}\nCommit: {commit}\nPerformance profile: {profile}"
             deployment_status[modal_name] = {
                 "status": "failed",
-                "details": result,
-                "stderr": deploy_process.stderr,
-                "stdout": deploy_process.stdout,
-                "repo_url": repo_url
+                "details": f"Deployment failed with exit code {returncode}",
+                "repo_url": repo_url,
+                "commit": commit,
+                "profile": profile
             }
         return result
             
     except Exception as e:
         error_msg = f"An error occurred: {str(e)}"
+        operation_logs.append(modal_name, error_msg)
         deployment_status[modal_name] = {"status": "error", "details": error_msg, "repo_url": repo_url}
         return error_msg
     finally:
-        os.chdir(original_dir)
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        modal_status.invalidate(modal_name)
+        operation_logs.end(modal_name)
+        deploy_duration.labels("deploy", outcome).observe(time.monotonic() - started)
+        # Last and guarded: cleanup must not turn a finished deploy into an error
+        if worktree is not None:
+            try:
+                git_cache.release(worktree)
+            except Exception as e:
+                print(f"Failed to release worktree {worktree}: {e}")
 
 
     # Function to check Modal app status
 def check_modal_status(modal_name):
     try:
-        # If we have status in our dictionary
-        if modal_name in deployment_status:
-            return deployment_status[modal_name]
-        
-        # If not in our dictionary, check with modal CLI
-        env = get_modal_env(modal_name)
-        
-        status_process = subprocess.run(
-            ["modal", "app", "show", modal_name],
-            capture_output=True, text=True,
-            env=env
-        )
+        # If we have status in our store
+        status = deployment_status.get(modal_name)
+        if status is not None:
+            return status
         
-        if status_process.returncode == 0:
-            return {
-                "status": "deployed",
-                "details": "App is deployed",
-                "cli_output": status_process.stdout
-            }
-        else:
-            return {
-                "status": "unknown",
-                "details": "App not found or error checking status",
-                "cli_output": status_process.stderr
-            }
+        # Otherwise ask modal, sharing cached and in-flight lookups between callers
+        return modal_status.lookup(modal_name)
     except Exception as e:
         return {
             "status": "error", 
@@ -284,113 +328,412 @@ def check_modal_status(modal_name):
 
 # Function to undeploy Modal app
 def undeploy_modal(modal_name):
+    with app_lock(modal_name):
+        return _undeploy_modal(modal_name)
+
+def _undeploy_modal(modal_name):
+    log_start = operation_logs.begin(modal_name, f"=== Undeploying {modal_name} ===")
+    started = time.monotonic()
+    outcome = "error"
     try:
         # Update status
         if modal_name in deployment_status:
             deployment_status[modal_name] = {"status": "undeploying", "details": "Undeployment in progress"}
         
         # Run modal undeploy command
-        env = get_modal_env(modal_name)
+        returncode, _, _ = modal_backend.stop(modal_name, on_line=log_to(modal_name))
+        output = operation_logs.text_since(modal_name, log_start)
+        outcome = "success" if returncode == 0 else "failure"
         
-        undeploy_process = subprocess.run(
-            ["modal", "app", "stop", modal_name],
-            capture_output=True, text=True,
-            env=env
-        )
-        
-        if undeploy_process.returncode == 0:
-            result = f"Undeployment successful!\n\nOutput:\n{undeploy_process.stdout}\n\nUndeployed app: {modal_name}"
+        if returncode == 0:
+            result = f"Undeployment successful!\n\nOutput:\n{output}\n\nUndeployed app: {modal_name}"
             deployment_status[modal_name] = {
                 "status": "undeployed",
-                "details": result,
-                "stdout": undeploy_process.stdout,
-                "undeployed_at": subprocess.check_output(["date"]).decode().strip()
+                "details": "Undeployment successful",
+                "undeployed_at": timestamp()
             }
         else:
-            result = f"Undeployment failed.\n\nError:\n{undeploy_process.stderr}\n\nOutput:\n{undeploy_process.stdout}\n\nAttempted with MODAL_NAME: {modal_name}"
+            result = f"Undeployment failed.\n\nOutput:\n{output}\n\nAttempted with MODAL_NAME: {modal_name}"
             deployment_status[modal_name] = {
                 "status": "undeploy_failed",
-                "details": result,
-                "stderr": undeploy_process.stderr
+                "details": f"Undeployment failed with exit code {returncode}"
             }
         return result
         
     except Exception as e:
         error_msg = f"An error occurred during undeployment: {str(e)}"
+        operation_logs.append(modal_name, error_msg)
         deployment_status[modal_name] = {"status": "error", "details": error_msg}
         return error_msg
+    finally:
+        modal_status.invalidate(modal_name)
+        operation_logs.end(modal_name)
+        deploy_duration.labels("undeploy", outcome).observe(time.monotonic() - started)
+
+# Deploy job queue settings (override with environment variables)
+DEPLOY_WORKERS = int(os.environ.get("DEPLOY_WORKERS", "2"))
+DEPLOY_JOB_HISTORY = int(os.environ.get("DEPLOY_JOB_HISTORY", "500"))
+
+# Job queue that runs deployments on worker threads so the event loop stays free
+class DeployJobQueue:
+    def __init__(self, workers=2, history_limit=500):
+        self.jobs = OrderedDict()
+        self.done_events = {}
+        # Async waiters per job, woken when it finishes
+        self.async_waiters = defaultdict(list)
+        self.history_limit = history_limit
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.busy_workers = 0
+        self.completed = 0
+        self.total_wait_time = 0.0
+        self.workers = []
+        for index in range(workers):
+            worker = threading.Thread(target=self._worker, name=f"deploy-worker-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, fn, *args, kind="deploy", modal_name=None):
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "modal_name": modal_name,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "wait_time": None,
+            "run_time": None,
+            "result": None,
+            "error": None
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+            self.done_events[job_id] = threading.Event()
+            self._trim_history()
+        self.pending.put((job, fn, args))
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        with self.lock:
+            done = self.done_events.get(job_id)
+        if done is None:
+            return None
+        done.wait(timeout)
+        return self.get(job_id)
+
+    async def wait_async(self, job_id, timeout=None):
+        # Same as wait() for coroutines: parks on a future instead of a thread
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            done = self.done_events.get(job_id)
+            if done is None:
+                return None
+            if done.is_set():
+                return dict(self.jobs[job_id])
+            self.async_waiters[job_id].append((loop, future))
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        finally:
+            with self.lock:
+                waiters = self.async_waiters.get(job_id)
+                if waiters and (loop, future) in waiters:
+                    waiters.remove((loop, future))
+                    if not waiters:
+                        del self.async_waiters[job_id]
+        return self.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": len(self.workers),
+                "busy_workers": self.busy_workers,
+                "queue_depth": self.pending.qsize(),
+                "completed": self.completed,
+                "average_wait_time": self.total_wait_time / self.completed if self.completed else 0.0,
+                "oldest_queued_wait": max(
+                    (time.time() - job["submitted_at"] for job in self.jobs.values() if job["status"] == "queued"),
+                    default=0.0
+                )
+            }
+
+    def has_pending(self, modal_name):
+        # True while a queued or running job targets modal_name
+        with self.lock:
+            return any(
+                job["modal_name"] == modal_name and job["status"] in ("queued", "running")
+                for job in self.jobs.values()
+            )
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once the history limit is reached
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.history_limit:
+                break
+            if self.jobs[job_id]["status"] in ("finished", "failed"):
+                del self.jobs[job_id]
+                del self.done_events[job_id]
+
+    def _worker(self):
+        while True:
+            job, fn, args = self.pending.get()
+            with self.lock:
+                done = self.done_events[job["job_id"]]
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                job["wait_time"] = job["started_at"] - job["submitted_at"]
+                self.busy_workers += 1
+            try:
+                result = fn(*args)
+                status, error = "finished", None
+            except Exception as e:
+                result, status, error = None, "failed", str(e)
+            with self.lock:
+                job["status"] = status
+                job["result"] = result
+                job["error"] = error
+                job["finished_at"] = time.time()
+                job["run_time"] = job["finished_at"] - job["started_at"]
+                self.busy_workers -= 1
+                self.completed += 1
+                self.total_wait_time += job["wait_time"]
+                done.set()
+                wake_async_waiters(self.async_waiters.pop(job["job_id"], ()))
+
+deploy_jobs = DeployJobQueue(workers=DEPLOY_WORKERS, history_limit=DEPLOY_JOB_HISTORY)
+
+# Job queue metrics, read from the queue when /metrics is scraped
+metrics.gauge("deploy_jobs_queued", "Deploy and undeploy jobs waiting for a worker",
+              collect=lambda: {(): deploy_jobs.pending.qsize()})
+metrics.gauge("deploy_workers_busy", "Deploy workers running a job",
+              collect=lambda: {(): deploy_jobs.busy_workers})
+metrics.counter("deploy_jobs_completed_total", "Deploy and undeploy jobs finished",
+                collect=lambda: {(): deploy_jobs.completed})
+
+# Gradio generator: run a queued job and yield the app's live output until it finishes
+def follow_job(job_id, modal_name):
+    since = operation_logs.next_seq[modal_name]
+    view = deque(maxlen=LOG_BUFFER_LINES)
+    while True:
+        lines, _ = operation_logs.wait(modal_name, since, 1.0)
+        if lines:
+            view.extend(line for _, line in lines)
+            since = lines[-1][0] + 1
+            yield "\n".join(view)
+        job = deploy_jobs.get(job_id)
+        if job["status"] in ("finished", "failed"):
+            break
+    yield job["result"] if job["status"] == "finished" else f"An error occurred: {job['error']}"
+
+def run_deploy_job(repo_url, modal_name="default_app", profile=DEFAULT_PROFILE):
+    job_id = deploy_jobs.submit(deploy_modal, repo_url, modal_name, None, profile, modal_name=modal_name)
+    yield from follow_job(job_id, modal_name)
+
+def run_undeploy_job(modal_name):
+    job_id = deploy_jobs.submit(undeploy_modal, modal_name, kind="undeploy", modal_name=modal_name)
+    yield from follow_job(job_id, modal_name)
+
+# Reject unknown performance profiles before a job is queued
+def check_profile(profile):
+    try:
+        resolve_profile(profile, PERFORMANCE_PROFILES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Add FastAPI endpoints
 @app.post("/api/deploy")
 async def api_deploy(request: DeployRequest):
+    check_profile(request.profile)
     # Note that we're passing request.repo_url but it will be overridden inside the function
-    result = deploy_modal(request.repo_url, request.modal_name)
-    return {"result": result, "note": f"Using hardcoded repository: {HARDCODED_REPO_URL}"}
+    job_id = deploy_jobs.submit(
+        deploy_modal, request.repo_url, request.modal_name, request.ref, request.profile,
+        modal_name=request.modal_name
+    )
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "queue_depth": deploy_jobs.stats()["queue_depth"],
+        "note": f"Using hardcoded repository: {HARDCODED_REPO_URL}"
+    }
+
+@app.get("/api/profiles")
+async def api_profiles():
+    return {"default": DEFAULT_PROFILE, "profiles": PERFORMANCE_PROFILES}
 
+@app.get("/api/jobs")
+async def api_jobs():
+    return deploy_jobs.stats()
+
+@app.get("/api/jobs/{job_id}")
+async def api_job(job_id: str):
+    job = deploy_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/wait")
+async def api_job_wait(job_id: str, timeout: float = 30.0):
+    # Waits on the event loop, so pollers hold no threads
+    job = await deploy_jobs.wait_async(job_id, min(timeout, 300.0))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/status/cache")
+async def api_status_cache():
+    return modal_status.stats()
+
+@app.get("/api/apps")
+def api_apps(status: Optional[str] = None, limit: int = 100):
+    return {"apps": deployment_status.list(status, min(limit, 1000))}
+
+@app.get("/api/history/{modal_name}")
+def api_history(modal_name: str, limit: int = 50):
+    return {"modal_name": modal_name, "history": deployment_status.history(modal_name, min(limit, 1000))}
+
+@app.get("/api/logs/{modal_name}")
+async def api_logs(modal_name: str, since: int = 0):
+    lines = operation_logs.lines_since(modal_name, since)
+    return {
+        "modal_name": modal_name,
+        "active": modal_name in operation_logs.active,
+        "next": lines[-1][0] + 1 if lines else since,
+        "lines": [line for _, line in lines]
+    }
+
+@app.get("/api/logs/{modal_name}/stream")
+async def api_logs_stream(modal_name: str, since: int = 0):
+    # Server-sent events: one event per output line, "end" once the operation finishes
+    async def events():
+        position = since
+        while True:
+            lines, active = await operation_logs.wait_async(modal_name, position, 15.0)
+            for seq, line in lines:
+                yield f"id: {seq}\ndata: {line}\n\n"
+                position = seq + 1
+            if not active and deploy_jobs.has_pending(modal_name):
+                # The job is still queued behind others; its output has not started yet
+                await asyncio.sleep(0.5)
+            elif not active:
+                status = deployment_status.get(modal_name, {}).get("status", "unknown")
+                yield f"event: end\ndata: {json.dumps({'status': status})}\n\n"
+                break
+            if not lines:
+                # Keep idle connections open through proxies
+                yield ": keep-alive\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# Upper bound on the parallelism a single batch request may ask for
+BATCH_MAX_PARALLELISM = int(os.environ.get("BATCH_MAX_PARALLELISM", "16"))
+
+# Queue submit(modal_name) on deploy_jobs for every app, keeping at most
+# `parallelism` of this batch's jobs queued or running, and stream one
+# NDJSON line per app as its job completes, followed by a summary line.
+# The jobs share the DEPLOY_WORKERS workers with single deploys; apps not
+# yet queued when the client goes away are skipped.
+async def stream_batch(submit, modal_names, parallelism, success_status):
+    modal_names = list(dict.fromkeys(modal_names))
+    window = max(1, min(parallelism, BATCH_MAX_PARALLELISM))
+    remaining = iter(modal_names)
+    in_flight = {}
+
+    def submit_next():
+        for name in remaining:
+            in_flight[asyncio.ensure_future(deploy_jobs.wait_async(submit(name)))] = name
+            if len(in_flight) >= window:
+                break
+
+    batch_start = time.time()
+    timings = {}
+    succeeded = []
+    failed = []
+    try:
+        submit_next()
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in done:
+                name = in_flight.pop(waiter)
+                job = waiter.result()
+                result = job["result"] if job["status"] == "finished" else f"An error occurred: {job['error']}"
+                status = deployment_status.get(name, {}).get("status", "unknown")
+                timings[name] = round(job["run_time"], 3)
+                (succeeded if status == success_status else failed).append(name)
+                yield json.dumps({
+                    "modal_name": name,
+                    "job_id": job["job_id"],
+                    "status": status,
+                    "duration": timings[name],
+                    "result": result
+                }) + "\n"
+            submit_next()
+        yield json.dumps({
+            "summary": {
+                "total": len(modal_names),
+                "succeeded": succeeded,
+                "failed": failed,
+                "wall_time": round(time.time() - batch_start, 3),
+                "timings": timings
+            }
+        }) + "\n"
+    finally:
+        # Queued jobs keep running if the client goes away; only the waits stop
+        for waiter in in_flight:
+            waiter.cancel()
+
+@app.post("/api/batch/deploy")
+async def api_batch_deploy(request: BatchRequest):
+    check_profile(request.profile)
+    return StreamingResponse(
+        stream_batch(
+            lambda name: deploy_jobs.submit(
+                deploy_modal, HARDCODED_REPO_URL, name, request.ref, request.profile, modal_name=name
+            ),
+            request.modal_names, request.parallelism, "deployed"
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/api/batch/undeploy")
+async def api_batch_undeploy(request: BatchRequest):
+    return StreamingResponse(
+        stream_batch(
+            lambda name: deploy_jobs.submit(undeploy_modal, name, kind="undeploy", modal_name=name),
+            request.modal_names, request.parallelism, "undeployed"
+        ),
+        media_type="application/x-ndjson"
+    )
+
+# Status and undeploy still run synchronously, so let FastAPI run them in its threadpool
 @app.post("/api/status")
-async def api_status(request: StatusRequest):
+def api_status(request: StatusRequest):
     status = check_modal_status(request.modal_name)
     return status
 
 @app.post("/api/undeploy")
-async def api_undeploy(request: UndeployRequest):
+def api_undeploy(request: UndeployRequest):
     result = undeploy_modal(request.modal_name)
     return {"result": result}
 
-# Handle OPTIONS requests for CORS preflight
+# Prometheus scrape endpoint; with METRICS_TOKEN set it needs the matching bearer token
+@app.get("/metrics")
+def metrics_endpoint(request: Request):
+    if METRICS_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+# Handle OPTIONS requests for CORS preflight; CORS headers are added by RequestPolicyMiddleware
 @app.options("/{path:path}")
 async def handle_options(request: Request, path: str):
-    origin = request.headers.get("Origin", "")
-    domain = ""
-    
-    # Extract domain from origin
-    if origin:
-        if "://" in origin:
-            domain = origin.split("://")[1]
-        if "/" in domain:
-            domain = domain.split("/")[0]
-        if ":" in domain:
-            domain = domain.split(":")[0]
-    
-    # Create response with appropriate headers
-    response = Response()
-    
-    # If origin is from an allowed domain, add CORS headers
-    if domain in ALLOWED_DOMAINS:
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-    
-    return response
-
-# Add CORS headers to responses
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    # Process the request
-    response = await call_next(request)
-    
-    # Get the origin from the request headers
-    origin = request.headers.get("Origin", "")
-    domain = ""
-    
-    # Extract domain from origin
-    if origin:
-        if "://" in origin:
-            domain = origin.split("://")[1]
-        if "/" in domain:
-            domain = domain.split("/")[0]
-        if ":" in domain:
-            domain = domain.split(":")[0]
-    
-    # If origin is from an allowed domain, add CORS headers
-    if domain in ALLOWED_DOMAINS:
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-    
-    return response
+    return Response()
 
 # Create Gradio interface
 with gr.Blocks() as demo:
@@ -409,6 +752,11 @@ with gr.Blocks() as demo:
             placeholder="my_modal_app",
             value="default_app"
         )
+        profile = gr.Dropdown(
+            label="Performance Profile",
+            choices=sorted(PERFORMANCE_PROFILES),
+            value=DEFAULT_PROFILE
+        )
     
     with gr.Row():
         deploy_button = gr.Button("Deploy to Modal")
@@ -418,8 +766,8 @@ with gr.Blocks() as demo:
     output = gr.Textbox(label="Result", lines=10)
     
     deploy_button.click(
-        fn=deploy_modal,
-        inputs=[repo_url, modal_name],
+        fn=run_deploy_job,
+        inputs=[repo_url, modal_name, profile],
         outputs=output
     )
     
@@ -430,7 +778,7 @@ with gr.Blocks() as demo:
     )
     
     undeploy_button.click(
-        fn=undeploy_modal,
+        fn=run_undeploy_job,
         inputs=[modal_name],
         outputs=output
     )
@@ -0,0 +1,87 @@
+"""Compare per-operation latency of the modal backends.
+
+Runs `show` and `list` repeatedly against each backend and prints mean,
+p50 and p95 latency in milliseconds. Uses the real modal CLI, so
+credentials must be available (MODAL_TOKEN_ID / MODAL_TOKEN_SECRET);
+`fake` needs nothing and measures the harness overhead.
+
+    python benchmarks/backend_latency.py --app my_app --iterations 10 \
+        --backends cli,worker,fake --json results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modal_backend import create_backend
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(backend, operation, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation(backend)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(timings), 2),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="default_app", help="app name used for `show`")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--backends", default="cli,worker,fake")
+    parser.add_argument("--json", help="write results to this file")
+    options = parser.parse_args()
+
+    operations = {
+        "show": lambda backend: backend.show(options.app),
+        "list": lambda backend: backend.list()
+    }
+    results = {}
+    for kind in options.backends.split(","):
+        try:
+            backend = create_backend(kind)
+        except Exception as e:
+            print(f"{kind:8} unavailable: {e}")
+            continue
+        try:
+            # The first call pays one-off start-up costs; report it separately
+            start = time.perf_counter()
+            backend.show(options.app)
+            results[kind] = {"first_call_ms": round((time.perf_counter() - start) * 1000, 2)}
+            for name, operation in operations.items():
+                results[kind][name] = measure(backend, operation, options.iterations)
+        except OSError as e:
+            print(f"{kind:8} unavailable: {e}")
+            continue
+        finally:
+            backend.close()
+        row = results[kind]
+        print(
+            f"{kind:8} first={row['first_call_ms']:>9.2f}ms  "
+            + "  ".join(
+                f"{name}: mean={row[name]['mean_ms']:.2f} p50={row[name]['p50_ms']:.2f} p95={row[name]['p95_ms']:.2f}"
+                for name in operations
+            )
+        )
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
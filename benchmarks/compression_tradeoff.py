@@ -0,0 +1,132 @@
+"""Bandwidth vs CPU trade-off of the web_app response compression.
+
+Streams JSON payloads through CompressionMiddleware in 16 KiB chunks (the
+way proxied bodies arrive from the backend) for each available encoding
+and level, and reports the compression ratio, CPU time per MiB and how
+much uncompressed traffic the proxy's 1.5 vCPU budget could compress.
+
+    python benchmarks/compression_tradeoff.py --sizes 4096,65536,1048576 \
+        --gzip-levels 1,6,9 --brotli-qualities 1,4,6 --zstd-levels 1,3,9 \
+        --json results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression import CompressionMiddleware, available_encodings
+
+CHUNK_SIZE = 16 * 1024
+# vCPUs given to the web_app function in modal_container.py
+CPU_BUDGET = 1.5
+
+
+def make_payload(size):
+    # Repetitive-but-varied JSON, similar to the galaxybackend's API responses
+    rng = random.Random(size)
+    records = []
+    length = 0
+    while length < size:
+        record = json.dumps({
+            "id": rng.randrange(10 ** 6),
+            "player": "player_%d" % rng.randrange(5000),
+            "planet": rng.choice(["earth", "mars", "venus", "jupiter", "saturn"]),
+            "score": rng.randrange(10 ** 5),
+            "active": rng.random() > 0.5,
+            "updated_at": "2024-05-%02dT%02d:%02d:00Z" % (rng.randrange(1, 29), rng.randrange(24), rng.randrange(60))
+        })
+        records.append(record)
+        length += len(record) + 2
+    return ("[" + ", ".join(records) + "]").encode()[:size]
+
+
+def build_app(payload):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")]
+        })
+        for offset in range(0, len(payload), CHUNK_SIZE):
+            await send({
+                "type": "http.response.body",
+                "body": payload[offset:offset + CHUNK_SIZE],
+                "more_body": offset + CHUNK_SIZE < len(payload)
+            })
+    return app
+
+
+async def drive(middleware, encoding, repeat):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", encoding.encode())]}
+    out = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal out
+        if message["type"] == "http.response.body":
+            out += len(message.get("body", b""))
+
+    start = time.process_time()
+    for _ in range(repeat):
+        await middleware(dict(scope), receive, send)
+    return (time.process_time() - start) / repeat, out // repeat
+
+
+def measure(payload, encoding, level, repeat):
+    levels = {"gzip_level": level, "brotli_quality": level, "zstd_level": level}
+    middleware = CompressionMiddleware(build_app(payload), minimum_size=0, encodings=[encoding], **levels)
+    cpu_seconds, compressed = asyncio.run(drive(middleware, encoding, repeat))
+    mib = len(payload) / (1024 * 1024)
+    return {
+        "ratio": round(len(payload) / max(1, compressed), 2),
+        "compressed_bytes": compressed,
+        "cpu_ms": round(cpu_seconds * 1000, 3),
+        "cpu_ms_per_mib": round(cpu_seconds * 1000 / mib, 2),
+        # Uncompressed MiB/s the whole CPU budget could compress
+        "max_mib_per_s_at_budget": round(CPU_BUDGET * mib / cpu_seconds, 1) if cpu_seconds else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="4096,65536,1048576", help="payload sizes in bytes")
+    parser.add_argument("--gzip-levels", default="1,6,9")
+    parser.add_argument("--brotli-qualities", default="1,4,6")
+    parser.add_argument("--zstd-levels", default="1,3,9")
+    parser.add_argument("--repeat", type=int, default=0, help="runs per case (default: scaled to payload size)")
+    parser.add_argument("--json", help="write results to this file")
+    options = parser.parse_args()
+
+    levels = {
+        "gzip": [int(level) for level in options.gzip_levels.split(",")],
+        "br": [int(level) for level in options.brotli_qualities.split(",")],
+        "zstd": [int(level) for level in options.zstd_levels.split(",")]
+    }
+    results = []
+    print(f"{'size':>9} {'encoding':8} {'level':>5} {'ratio':>7} {'cpu ms':>9} {'ms/MiB':>9} {'MiB/s @1.5 vCPU':>16}")
+    for size in (int(size) for size in options.sizes.split(",")):
+        payload = make_payload(size)
+        repeat = options.repeat or max(3, min(500, (4 * 1024 * 1024) // size))
+        for encoding in available_encodings():
+            for level in levels[encoding]:
+                row = dict(size=size, encoding=encoding, level=level, **measure(payload, encoding, level, repeat))
+                results.append(row)
+                print(
+                    f"{size:>9} {encoding:8} {level:>5} {row['ratio']:>7.2f} {row['cpu_ms']:>9.3f} "
+                    f"{row['cpu_ms_per_mib']:>9.2f} {row['max_mib_per_s_at_budget'] or 0:>16.1f}"
+                )
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Stand-in for the modal CLI used by the local benchmarks.
+
+Accepts the commands app.py runs (`deploy`, `app show`, `app stop`,
+`app list --json`) and answers them with modal_backend.FakeBackend. App
+state is kept in a JSON file (FAKE_MODAL_STATE) so it survives between
+the separate processes CliBackend starts; FAKE_MODAL_LATENCY adds a
+delay in seconds to every command.
+
+    MODAL_CLI="python benchmarks/fake_modal_cli.py" python app.py
+"""
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modal_backend import FakeBackend
+
+STATE_PATH = os.environ.get("FAKE_MODAL_STATE", os.path.join(tempfile.gettempdir(), "fake-modal-state.json"))
+
+
+def main():
+    backend = FakeBackend(latency=float(os.environ.get("FAKE_MODAL_LATENCY", "0")))
+    try:
+        with open(STATE_PATH) as f:
+            backend.apps = json.load(f)
+    except (OSError, ValueError):
+        pass
+    returncode, stdout, stderr = backend.run(sys.argv[1:], os.environ.copy(), os.getcwd())
+    # Concurrent commands may race here; last writer wins, which is fine for benchmarking
+    with open(STATE_PATH, "w") as f:
+        json.dump(backend.apps, f)
+    if stdout:
+        print(stdout)
+    if stderr:
+        print(stderr, file=sys.stderr)
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Local load test of the web_app proxy and the app.py deploy service.
+
+Starts, on this machine:
+
+- the web_app FastAPI app from modal_container.py, whose backend pool runs
+  benchmarks/stub_backend.py on --backend-port (7860, as on Modal)
+- app.py under uvicorn, with MODAL_BACKEND=cli pointed at
+  benchmarks/fake_modal_cli.py so no Modal account is touched
+
+then drives concurrent requests carrying an allowed Origin at each
+target and at the stub backend directly, and reports requests per
+second, p50/p95/p99 latency, the proxy's overhead over the direct
+backend and the resident memory of every server process. Results are
+written as JSON; pass an earlier file to --compare to see what changed.
+
+    python benchmarks/load_test.py --requests 2000 --concurrency 1,16,64 \
+        --json after.json --compare before.json
+
+Needs the proxy and app.py dependencies installed locally. RSS is read
+from /proc and is reported as null on other platforms.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from proxy_throughput import ORIGIN_HEADERS, percentile, serve_proxy, wait_until_ready
+
+# Requests sent to each target, cycled in order
+PROXY_REQUESTS = [("GET", "/bench/item", None)]
+APP_REQUESTS = [
+    ("GET", "/api/jobs", None),
+    ("GET", "/api/apps", None),
+    ("POST", "/api/status", {"modal_name": "bench_app"})
+]
+
+
+def memory(pid):
+    """Resident and peak resident memory of a process in MiB, from /proc."""
+    usage = {"rss_mib": None, "peak_rss_mib": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["rss_mib"] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    usage["peak_rss_mib"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+
+def child_pids(pid):
+    # Children are listed per thread, and the backend pool may start them from any thread
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def process_memory(processes):
+    # processes: {name: pid}; children (e.g. backend workers) are listed under their parent
+    report = {}
+    for name, pid in processes.items():
+        report[name] = memory(pid)
+        for child in child_pids(pid):
+            report[f"{name}/{child}"] = memory(child)
+    return report
+
+
+async def run_load(client, requests, total, concurrency):
+    timings = []
+    statuses = {}
+    errors = 0
+    pending = iter(range(total))
+    cycle = itertools.cycle(requests)
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            method, path, body = next(cycle)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=ORIGIN_HEADERS, json=body)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if not status.isdigit() or int(status) >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "mean_ms": round(sum(timings) / len(timings), 2),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "errors": errors,
+        "statuses": statuses
+    }
+
+
+async def wait_for_app(client, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {process.returncode}")
+        try:
+            if (await client.get("/api/jobs", headers=ORIGIN_HEADERS)).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("app.py did not start")
+
+
+def start_app(options, workdir):
+    state = os.path.join(workdir, "fake-modal-state.json")
+    with open(state, "w") as f:
+        json.dump({"bench_app": "deployed"}, f)
+    env = dict(
+        os.environ,
+        MODAL_BACKEND="cli",
+        MODAL_CLI=f"{sys.executable} {os.path.join(ROOT, 'benchmarks', 'fake_modal_cli.py')}",
+        FAKE_MODAL_STATE=state,
+        STATUS_DB_PATH=os.path.join(workdir, "deployment_status.db"),
+        GIT_CACHE_DIR=os.path.join(workdir, "git-cache"),
+        # Measure throughput, not the per-client rate limit
+        RATE_LIMIT_ROUTES=json.dumps({"/": [10 ** 9, 60]})
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(options.app_port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+
+
+def print_row(target, concurrency, row):
+    print(
+        f"{target:8} c={concurrency:<4} {row['rps']:>9.1f} req/s  p50={row['p50_ms']:.2f}ms "
+        f"p95={row['p95_ms']:.2f}ms p99={row['p99_ms']:.2f}ms errors={row['errors']}"
+    )
+
+
+async def run_targets(options, processes, app=None, proxy=None):
+    import httpx
+
+    levels = [int(level) for level in options.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    clients = {
+        "backend": httpx.AsyncClient(base_url=f"http://127.0.0.1:{options.backend_port}", limits=limits, timeout=60),
+        "proxy": httpx.AsyncClient(base_url=f"http://127.0.0.1:{options.proxy_port}", limits=limits, timeout=60),
+        "app": httpx.AsyncClient(base_url=f"http://127.0.0.1:{options.app_port}", limits=limits, timeout=60)
+    }
+    targets = options.targets.split(",")
+    results = {"load": {target: {} for target in targets}}
+    try:
+        if "proxy" in targets or "backend" in targets:
+            # The proxy starts the stub backend, so the direct baseline needs it too
+            results["proxy_cold_start"] = await wait_until_ready(clients["proxy"], proxy)
+        if "app" in targets:
+            await wait_for_app(clients["app"], app)
+        results["memory_idle"] = process_memory(processes)
+
+        for concurrency in levels:
+            for target in targets:
+                requests = APP_REQUESTS if target == "app" else PROXY_REQUESTS
+                # Warm-up round so connection set-up is not measured
+                await run_load(clients[target], requests, concurrency, concurrency)
+                row = await run_load(clients[target], requests, options.requests, concurrency)
+                results["load"][target][str(concurrency)] = row
+                print_row(target, concurrency, row)
+        results["memory_loaded"] = process_memory(processes)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+    if "proxy" in targets and "backend" in targets:
+        results["proxy_overhead"] = {}
+        for level, proxy in results["load"]["proxy"].items():
+            direct = results["load"]["backend"][level]
+            results["proxy_overhead"][level] = {
+                "p50_ms": round(proxy["p50_ms"] - direct["p50_ms"], 2),
+                "p95_ms": round(proxy["p95_ms"] - direct["p95_ms"], 2),
+                "p99_ms": round(proxy["p99_ms"] - direct["p99_ms"], 2),
+                "rps_ratio": round(proxy["rps"] / direct["rps"], 3) if direct["rps"] else None
+            }
+            overhead = results["proxy_overhead"][level]
+            print(
+                f"overhead c={level:<4} p50=+{overhead['p50_ms']:.2f}ms p95=+{overhead['p95_ms']:.2f}ms "
+                f"p99=+{overhead['p99_ms']:.2f}ms throughput x{overhead['rps_ratio']}"
+            )
+    for name, usage in results["memory_loaded"].items():
+        print(f"rss      {name:16} {usage['rss_mib']} MiB (peak {usage['peak_rss_mib']} MiB)")
+    return results
+
+
+def compare(results, previous):
+    """Print RPS and p95 changes against an earlier run, per target and concurrency."""
+    print(f"compared with {previous.get('metadata', {}).get('commit') or 'previous run'}:")
+    for target, levels in results["load"].items():
+        for level, row in levels.items():
+            before = previous.get("load", {}).get(target, {}).get(level)
+            if not before:
+                continue
+            rps = (row["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0.0
+            print(
+                f"{target:8} c={level:<4} rps {before['rps']:.1f} -> {row['rps']:.1f} ({rps:+.1f}%)  "
+                f"p95 {before['p95_ms']:.2f} -> {row['p95_ms']:.2f}ms"
+            )
+
+
+def metadata(options):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "options": vars(options)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default="backend,proxy,app", help="any of backend, proxy, app")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per target and concurrency level")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--backend-port", type=int, default=7860, help="stub backend port (web_app's default)")
+    parser.add_argument("--backend-workers", type=int, default=1)
+    parser.add_argument("--proxy-port", type=int, default=8800)
+    parser.add_argument("--app-port", type=int, default=8900)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    options = parser.parse_args()
+
+    targets = options.targets.split(",")
+    workdir = tempfile.mkdtemp(prefix="modal-load-test-")
+    proxy = app = None
+    processes = {}
+    try:
+        if "proxy" in targets or "backend" in targets:
+            proxy = multiprocessing.Process(
+                target=serve_proxy, args=(options.proxy_port, options.backend_port, options.backend_workers),
+                daemon=True
+            )
+            proxy.start()
+            processes["proxy"] = proxy.pid
+        if "app" in targets:
+            app = start_app(options, workdir)
+            processes["app"] = app.pid
+        results = asyncio.run(run_targets(options, processes, app, proxy))
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+            proxy.join(10)
+        if app is not None:
+            app.terminate()
+            app.wait(10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["metadata"] = metadata(options)
+    if options.compare:
+        with open(options.compare) as f:
+            compare(results, json.load(f))
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
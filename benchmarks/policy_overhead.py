@@ -0,0 +1,166 @@
+"""Per-request overhead of the app.py request policy layer.
+
+Compares the previous stack of BaseHTTPMiddleware classes plus the CORS
+function middleware ("legacy") with RequestPolicyMiddleware ("policy"),
+both wrapped around the same trivial Starlette endpoint and driven
+in-process through ASGI, so no network or server cost is included.
+
+    python benchmarks/policy_overhead.py --requests 20000 --json results.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from rate_limit import RateLimiter
+from request_policy import RequestPolicyMiddleware, SECURITY_HEADERS, CORS_HEADERS, DEFAULT_BLOCKED_AGENTS
+
+ALLOWED_DOMAINS = ["galaxykicklock.web.app", "lightning.ai", "huggingface.co"]
+REQUEST_HEADERS = [
+    (b"host", b"localhost"),
+    (b"origin", b"https://galaxykicklock.web.app"),
+    (b"user-agent", b"Mozilla/5.0"),
+    (b"accept", b"application/json"),
+    (b"accept-language", b"en-US")
+]
+
+
+async def endpoint(request):
+    return PlainTextResponse("ok")
+
+
+# The middleware stack app.py used before RequestPolicyMiddleware, kept here as the baseline
+def _legacy_domain(url):
+    if "://" in url:
+        url = url.split("://")[1]
+    if "/" in url:
+        url = url.split("/")[0]
+    if ":" in url:
+        url = url.split(":")[0]
+    return url
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app, limiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request, call_next):
+        allowed, _ = self.limiter.check(request.client.host, request.url.path)
+        if not allowed:
+            return JSONResponse({"error": "Too many requests"}, status_code=429)
+        return await call_next(request)
+
+
+class LegacyAntiAutomation(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        if request.method == "OPTIONS":
+            return await call_next(request)
+        user_agent = request.headers.get("User-Agent", "").lower()
+        if any(agent in user_agent for agent in DEFAULT_BLOCKED_AGENTS):
+            return JSONResponse({"error": "Access denied"}, status_code=403)
+        if not request.headers.get("Accept-Language") and not request.headers.get("Accept"):
+            return JSONResponse({"error": "Access denied"}, status_code=403)
+        return await call_next(request)
+
+
+class LegacyDomainRestriction(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        origin = _legacy_domain(request.headers.get("Origin", ""))
+        referer = _legacy_domain(request.headers.get("Referer", ""))
+        if origin not in ALLOWED_DOMAINS and referer not in ALLOWED_DOMAINS:
+            return JSONResponse({"error": "Access denied"}, status_code=403)
+        return await call_next(request)
+
+
+class LegacyCors(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        origin = request.headers.get("Origin", "")
+        if _legacy_domain(origin) in ALLOWED_DOMAINS:
+            response.headers["Access-Control-Allow-Origin"] = origin
+            for name, value in CORS_HEADERS.items():
+                response.headers[name] = value
+        return response
+
+
+def build_apps():
+    routes = [Route("/api/status", endpoint)]
+    limiter = lambda: RateLimiter(requests_limit=10 ** 9, time_window=60)
+    return {
+        "none": Starlette(routes=routes),
+        "legacy": Starlette(routes=routes, middleware=[
+            Middleware(LegacyCors),
+            Middleware(LegacyDomainRestriction),
+            Middleware(LegacyAntiAutomation),
+            Middleware(LegacyRateLimit, limiter=limiter()),
+            Middleware(LegacySecurityHeaders)
+        ]),
+        "policy": Starlette(routes=routes, middleware=[
+            Middleware(RequestPolicyMiddleware, allowed_domains=ALLOWED_DOMAINS, rate_limiter=limiter())
+        ])
+    }
+
+
+async def drive(app, requests):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/status", "raw_path": b"/api/status",
+        "query_string": b"", "root_path": "", "headers": REQUEST_HEADERS,
+        "client": ("127.0.0.1", 50000), "server": ("localhost", 7860)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Warm up (lifespan-free apps build their middleware stack lazily)
+    for _ in range(100):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--json", help="write results to this file")
+    options = parser.parse_args()
+
+    results = {}
+    for name, app in build_apps().items():
+        results[name] = round(asyncio.run(drive(app, options.requests)), 2)
+    for name in ("legacy", "policy"):
+        overhead = results[name] - results["none"]
+        print(f"{name:7} {results[name]:8.2f} us/request  (middleware overhead {overhead:.2f} us)")
+    print(f"{'none':7} {results['none']:8.2f} us/request")
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"us_per_request": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
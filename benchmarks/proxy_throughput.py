@@ -0,0 +1,203 @@
+"""HTTP and WebSocket throughput through the web_app proxy.
+
+Starts the web_app FastAPI app from modal_container.py under uvicorn in a
+child process, with its backend pool running benchmarks/stub_backend.py,
+then measures from this process:
+
+- requests per second and latency for each proxied HTTP method
+- WebSocket connections opened and closed per second
+- WebSocket echo round trips per second over concurrent connections
+
+Needs the proxy dependencies installed locally (modal, fastapi, httpx,
+uvicorn, websockets).
+
+    python benchmarks/proxy_throughput.py --requests 2000 --concurrency 32 \
+        --backend-workers 2 --json results.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ORIGIN_HEADERS = {"origin": "https://galaxykicklock.web.app", "accept": "application/json"}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def serve_proxy(port, backend_port, backend_workers):
+    # Runs in the child process: the PROXY_* settings are read at import
+    os.environ["PROXY_BACKEND_SCRIPT"] = os.path.join(ROOT, "benchmarks", "stub_backend.py")
+    os.environ["PROXY_BACKEND_BASE_PORT"] = str(backend_port)
+    os.environ["PROXY_BACKEND_WORKERS"] = str(backend_workers)
+    os.environ.setdefault("PROXY_LOG_EVENT_RATE", "1")
+    import uvicorn
+    import modal_container
+
+    # The FastAPI app web_app serves, without Modal's function wrapper
+    uvicorn.run(modal_container.create_web_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_until_ready(client, process=None, timeout=60):
+    # process: the multiprocessing.Process serving the proxy, to fail fast if it dies
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.exitcode is not None:
+            raise RuntimeError(f"proxy exited with code {process.exitcode}")
+        try:
+            response = await client.get("/status", headers=ORIGIN_HEADERS)
+            if response.status_code == 200 and response.json()["health"]["ready"]:
+                return response.json()["health"]["cold_start"]
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("proxy did not become ready")
+
+
+async def measure_http(client, method, requests, concurrency):
+    timings = []
+    errors = 0
+    pending = iter(range(requests))
+    body = b"x" * 256 if method in ("POST", "PUT", "PATCH") else None
+
+    async def run():
+        nonlocal errors
+        for _ in pending:
+            start = time.perf_counter()
+            response = await client.request(method, "/bench/item", headers=ORIGIN_HEADERS, content=body)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "errors": errors
+    }
+
+
+async def measure_ws_connections(url, connections, concurrency):
+    from websockets.asyncio.client import connect
+
+    pending = iter(range(connections))
+    timings = []
+
+    async def run():
+        for _ in pending:
+            start = time.perf_counter()
+            async with connect(url, origin=ORIGIN_HEADERS["origin"]) as websocket:
+                await websocket.send("ping")
+                await websocket.recv()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "connections_per_second": round(connections / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2)
+    }
+
+
+async def measure_ws_messages(url, connections, messages, size):
+    from websockets.asyncio.client import connect
+
+    payload = b"m" * size
+    round_trips = []
+
+    async def run():
+        async with connect(url, origin=ORIGIN_HEADERS["origin"], max_size=None) as websocket:
+            for _ in range(messages):
+                start = time.perf_counter()
+                await websocket.send(payload)
+                await websocket.recv()
+                round_trips.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    total = connections * messages
+    return {
+        "messages_per_second": round(total / elapsed, 1),
+        "megabytes_per_second": round(total * size * 2 / elapsed / 1e6, 2),
+        "rtt_p50_ms": round(statistics.median(round_trips), 3),
+        "rtt_p95_ms": round(percentile(round_trips, 0.95), 3)
+    }
+
+
+async def run_benchmarks(options, server=None):
+    import httpx
+
+    base_url = f"http://127.0.0.1:{options.port}"
+    ws_url = f"ws://127.0.0.1:{options.port}/bench/ws"
+    limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        results = {"cold_start": await wait_until_ready(client, server), "http": {}}
+        for method in options.methods.split(","):
+            results["http"][method] = await measure_http(client, method, options.requests, options.concurrency)
+            row = results["http"][method]
+            print(f"{method:7} {row['rps']:>9.1f} req/s  p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms errors={row['errors']}")
+
+        results["ws_connect"] = await measure_ws_connections(ws_url, options.ws_connections, options.concurrency)
+        row = results["ws_connect"]
+        print(f"ws open {row['connections_per_second']:>9.1f} conn/s p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms")
+
+        results["ws_messages"] = await measure_ws_messages(
+            ws_url, options.concurrency, options.ws_messages, options.message_size
+        )
+        row = results["ws_messages"]
+        print(
+            f"ws echo {row['messages_per_second']:>9.1f} msg/s  {row['megabytes_per_second']:.2f} MB/s  "
+            f"rtt p50={row['rtt_p50_ms']:.3f}ms p95={row['rtt_p95_ms']:.3f}ms"
+        )
+
+        status = await client.get("/status", headers=ORIGIN_HEADERS)
+        results["proxy_status"] = status.json()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8800, help="port for the proxy")
+    parser.add_argument("--backend-port", type=int, default=17860, help="first stub backend port")
+    parser.add_argument("--backend-workers", type=int, default=1)
+    parser.add_argument("--methods", default="GET,HEAD,POST,PUT,PATCH,DELETE")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per HTTP method")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ws-connections", type=int, default=500)
+    parser.add_argument("--ws-messages", type=int, default=200, help="messages per WebSocket connection")
+    parser.add_argument("--message-size", type=int, default=1024)
+    parser.add_argument("--json", help="write results to this file")
+    options = parser.parse_args()
+
+    server = multiprocessing.Process(
+        target=serve_proxy, args=(options.port, options.backend_port, options.backend_workers), daemon=True
+    )
+    server.start()
+    try:
+        results = asyncio.run(run_benchmarks(options, server))
+    finally:
+        server.terminate()
+        server.join(5)
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Stand-in for the galaxybackend used by the local benchmarks.
+
+Answers every HTTP method on every path with a small JSON echo (or a body
+of ?size= bytes) and echoes WebSocket messages back. Listens on the port
+given in PORT, the same way the web_app backend pool starts its workers.
+
+    PORT=7860 python benchmarks/stub_backend.py
+"""
+import os
+import json
+
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"]
+
+
+async def echo(request):
+    body = await request.body()
+    size = request.query_params.get("size")
+    if size is not None:
+        # Compressible JSON-like payload of roughly `size` bytes
+        record = b'{"player": "galaxy", "score": 12345, "active": true},'
+        content = (record * (int(size) // len(record) + 1))[:int(size)]
+        return Response(content, media_type="application/json")
+    return Response(
+        json.dumps({"method": request.method, "path": request.url.path, "received": len(body)}),
+        media_type="application/json"
+    )
+
+
+async def websocket_echo(websocket):
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                await websocket.send_bytes(message["bytes"])
+            else:
+                await websocket.send_text(message.get("text") or "")
+    except WebSocketDisconnect:
+        pass
+
+
+app = Starlette(routes=[
+    WebSocketRoute("/{path:path}", websocket_echo),
+    Route("/{path:path}", echo, methods=METHODS)
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("PORT", "7860")), log_level="warning")
@@ -0,0 +1,238 @@
+import zlib
+
+# Optional encoders; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encodings in server preference order, used when the client rates them equally
+PREFERRED_ENCODINGS = ("br", "zstd", "gzip")
+
+# Content types worth compressing; anything else (images, archives, ...) passes through
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml",
+    "application/x-ndjson", "application/manifest+json", "image/svg+xml"
+)
+
+
+def available_encodings():
+    encodings = ["gzip"]
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    return [encoding for encoding in PREFERRED_ENCODINGS if encoding in encodings]
+
+
+def parse_accept_encoding(value):
+    """Parse Accept-Encoding into {coding: q}."""
+    codings = {}
+    for part in value.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def compressible(content_type):
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(("+json", "+xml"))
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self.stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        # Sync flush so every chunk reaches the client as soon as it arrives
+        return self.stream.compress(data) + self.stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        return self.stream.compress(data) + self.stream.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality):
+        self.stream = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.stream.process(data) + self.stream.flush()
+
+    def finish(self, data=b""):
+        return self.stream.process(data) + self.stream.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level):
+        self.stream = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.stream.compress(data) + self.stream.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data=b""):
+        return self.stream.compress(data) + self.stream.flush()
+
+
+class CompressionMiddleware:
+    """Pure ASGI response compression negotiated from Accept-Encoding.
+
+    Bodies are compressed chunk by chunk as they stream through, so memory
+    stays bounded and streamed responses are not held back. Responses that
+    are already encoded, not a compressible type, marked no-transform or
+    smaller than minimum_size pass through untouched. A body sent in one
+    message gets an exact Content-Length; a streamed one drops it.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4, zstd_level=3, encodings=None,
+                 stats=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [
+            encoding for encoding in (encodings or available_encodings())
+            if encoding in available_encodings()
+        ]
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        # Counters, optionally shared with the caller for reporting
+        self.stats = stats if stats is not None else {}
+        for counter in ("compressed", "skipped", "bytes_in", "bytes_out"):
+            self.stats.setdefault(counter, 0)
+
+    def negotiate(self, accept_encoding):
+        """Best encoding the client accepts, or None for identity."""
+        if not accept_encoding:
+            return None
+        codings = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = codings.get(encoding, codings.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def encoder(self, encoding):
+        level = self.levels[encoding]
+        if encoding == "br":
+            return BrotliEncoder(level)
+        if encoding == "zstd":
+            return ZstdEncoder(level)
+        return GzipEncoder(level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = self.negotiate(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+
+class _CompressingSend:
+    def __init__(self, middleware, encoding, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            if not self._eligible(message):
+                self.passthrough = True
+                self.middleware.stats["skipped"] += 1
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        stats = self.middleware.stats
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Whole body known and too small to be worth it
+                self.passthrough = True
+                stats["skipped"] += 1
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.encoder = self.middleware.encoder(self.encoding)
+            stats["compressed"] += 1
+            if not more_body:
+                data = self.encoder.finish(body)
+                stats["bytes_in"] += len(body)
+                stats["bytes_out"] += len(data)
+                await self.send(self._start_message(len(data)))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            await self.send(self._start_message(None))
+
+        data = self.encoder.compress(body) if more_body else self.encoder.finish(body)
+        stats["bytes_in"] += len(body)
+        stats["bytes_out"] += len(data)
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _eligible(self, message):
+        if message["status"] < 200 or message["status"] in (204, 206, 304):
+            return False
+        content_type = ""
+        for name, value in message.get("headers", ()):
+            name = name.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1")
+            elif name == b"content-length":
+                if value.isdigit() and int(value) < self.middleware.minimum_size:
+                    return False
+            elif name == b"cache-control" and b"no-transform" in value.lower():
+                return False
+        return compressible(content_type)
+
+    def _start_message(self, content_length):
+        headers = []
+        vary = None
+        for name, value in self.start.get("headers", ()):
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"vary":
+                vary = value
+                continue
+            if lower == b"etag" and not value.startswith(b"W/"):
+                # The encoded body is no longer byte-identical to the original
+                value = b"W/" + value
+            headers.append((name, value))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+            vary = vary + b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("latin-1")))
+        return dict(self.start, headers=headers)
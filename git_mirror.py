@@ -0,0 +1,165 @@
+import os
+import re
+import time
+import fcntl
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+# Mirror cache settings (override with environment variables)
+GIT_CACHE_DIR = os.environ.get("GIT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "modal-git-cache"))
+GIT_CACHE_MAX_BYTES = int(os.environ.get("GIT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+GIT_FETCH_TTL = float(os.environ.get("GIT_FETCH_TTL", "60"))
+
+# A full 40 character commit id can be resolved locally without fetching
+COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _git(*args):
+    result = subprocess.run(
+        ["git", *args],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+@contextmanager
+def _file_lock(path, mode=fcntl.LOCK_EX):
+    # Advisory lock shared with other processes using the same cache directory
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, mode)
+        yield
+
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class GitMirrorCache:
+    """Bare mirrors of remote repositories, checked out into per-job worktrees.
+
+    Mirrors are keyed by repository URL and refreshed with an incremental
+    fetch. A ref is resolved to a commit once per fetch, so repeated deploys of
+    an unchanged commit reuse the local objects without any network access.
+    """
+
+    def __init__(self, root=GIT_CACHE_DIR, max_bytes=GIT_CACHE_MAX_BYTES, fetch_ttl=GIT_FETCH_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fetch_ttl = fetch_ttl
+        self.mirrors_dir = os.path.join(root, "mirrors")
+        self.worktrees_dir = os.path.join(root, "worktrees")
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+        os.makedirs(self.worktrees_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.mirror_locks = {}
+        self.last_fetch = {}
+        self.active_worktrees = {}
+
+    def mirror_path(self, repo_url):
+        key = hashlib.sha1(repo_url.encode()).hexdigest()[:16]
+        return os.path.join(self.mirrors_dir, f"{key}.git")
+
+    def checkout(self, repo_url, ref=None):
+        """Return (worktree_path, commit) for ref (default: remote HEAD) of repo_url."""
+        mirror = self.mirror_path(repo_url)
+        # A shared "use" lock is held for the worktree's lifetime so no process
+        # evicts a mirror that a running deploy still reads from
+        use_lock = open(mirror + ".use", "a")
+        fcntl.flock(use_lock, fcntl.LOCK_SH)
+        try:
+            with self._locked(mirror):
+                commit = self._resolve(repo_url, mirror, ref)
+                worktree = os.path.join(self.worktrees_dir, f"{commit[:12]}-{uuid.uuid4().hex[:8]}")
+                _git("--git-dir", mirror, "worktree", "add", "--detach", worktree, commit)
+                # Record the mirror as recently used for eviction ordering
+                os.utime(mirror)
+        except BaseException:
+            use_lock.close()
+            raise
+        with self.lock:
+            self.active_worktrees[worktree] = (mirror, use_lock)
+        self.evict()
+        return worktree, commit
+
+    def release(self, worktree):
+        with self.lock:
+            mirror, use_lock = self.active_worktrees.pop(worktree, (None, None))
+        if mirror is None:
+            shutil.rmtree(worktree, ignore_errors=True)
+            return
+        try:
+            with self._locked(mirror):
+                try:
+                    _git("--git-dir", mirror, "worktree", "remove", "--force", worktree)
+                except subprocess.CalledProcessError:
+                    shutil.rmtree(worktree, ignore_errors=True)
+                    try:
+                        _git("--git-dir", mirror, "worktree", "prune")
+                    except subprocess.CalledProcessError as e:
+                        # Stale worktree metadata is pruned by a later release
+                        print(f"git worktree prune failed for {mirror}: {e.stderr.strip()}")
+        finally:
+            # Only now may evict() remove the mirror the worktree pointed into
+            use_lock.close()
+
+    def evict(self):
+        # Remove the least recently used idle mirrors until the cache fits
+        mirrors = []
+        for name in os.listdir(self.mirrors_dir):
+            path = os.path.join(self.mirrors_dir, name)
+            if os.path.isdir(path):
+                mirrors.append((os.path.getmtime(path), _directory_size(path), path))
+        total = sum(size for _, size, _ in mirrors)
+        for _, size, path in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            with self._locked(path):
+                with open(path + ".use", "a") as use_lock:
+                    try:
+                        fcntl.flock(use_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # A worktree of this mirror is still in use somewhere
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+            with self.lock:
+                self.last_fetch.pop(path, None)
+            total -= size
+
+    def _resolve(self, repo_url, mirror, ref):
+        if not os.path.isdir(mirror):
+            _git("clone", "--mirror", "--quiet", repo_url, mirror)
+            self.last_fetch[mirror] = time.time()
+        elif not (ref and COMMIT_SHA_PATTERN.match(ref) and self._has_commit(mirror, ref)):
+            # Branch names and HEAD can move, so refresh unless fetched recently
+            if time.time() - self.last_fetch.get(mirror, 0) >= self.fetch_ttl:
+                _git("--git-dir", mirror, "fetch", "--prune", "--quiet", "origin")
+                self.last_fetch[mirror] = time.time()
+        return _git("--git-dir", mirror, "rev-parse", "--verify", f"{ref or 'HEAD'}^{{commit}}")
+
+    def _has_commit(self, mirror, commit):
+        try:
+            _git("--git-dir", mirror, "cat-file", "-e", f"{commit}^{{commit}}")
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    @contextmanager
+    def _locked(self, mirror):
+        # Serialize git operations on one mirror across threads and processes
+        with self.lock:
+            thread_lock = self.mirror_locks.setdefault(mirror, threading.Lock())
+        with thread_lock:
+            with _file_lock(mirror + ".lock"):
+                yield
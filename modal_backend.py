@@ -0,0 +1,307 @@
+import os
+import abc
+import sys
+import json
+import time
+import queue
+import shlex
+import threading
+import traceback
+import subprocess
+from contextlib import redirect_stdout, redirect_stderr
+
+# Backend settings (override with environment variables)
+MODAL_BACKEND = os.environ.get("MODAL_BACKEND", "cli")
+MODAL_BACKEND_WORKERS = int(os.environ.get("MODAL_BACKEND_WORKERS", "2"))
+
+# Command used to invoke the modal CLI; point MODAL_CLI at a fake for local testing
+MODAL_CLI = shlex.split(os.environ.get("MODAL_CLI", "modal"))
+
+
+class ModalBackend(abc.ABC):
+    """Runs modal operations: deploy, show, stop and list.
+
+    Every operation returns (returncode, stdout, stderr). When on_line is
+    given, combined output is passed to it line by line as it is produced
+    and the returned stdout/stderr are empty. env_factory(modal_name)
+    builds the environment (app name and credentials) for an operation;
+    deploy() also accepts a prepared env. Subclasses implement run().
+    """
+
+    def __init__(self, env_factory=None):
+        self.env_factory = env_factory or (lambda modal_name: os.environ.copy())
+
+    def deploy(self, modal_name, source_dir, on_line=None, env=None):
+        if env is None:
+            env = self.env_factory(modal_name)
+        return self.run(["deploy", "modal_container.py"], env, source_dir, on_line)
+
+    def show(self, modal_name):
+        return self.run(["app", "show", modal_name], self.env_factory(modal_name))
+
+    def stop(self, modal_name, on_line=None):
+        return self.run(["app", "stop", modal_name], self.env_factory(modal_name), None, on_line)
+
+    def list(self):
+        return self.run(["app", "list", "--json"], self.env_factory(""))
+
+    @abc.abstractmethod
+    def run(self, args, env, cwd=None, on_line=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class CliBackend(ModalBackend):
+    """Starts a new modal CLI process for every operation."""
+
+    def __init__(self, env_factory=None, command=None):
+        super().__init__(env_factory)
+        self.command = command or MODAL_CLI
+
+    def run(self, args, env, cwd=None, on_line=None):
+        if on_line is None:
+            process = subprocess.run(
+                [*self.command, *args],
+                capture_output=True, text=True,
+                env=env,
+                cwd=cwd
+            )
+            return process.returncode, process.stdout, process.stderr
+        process = subprocess.Popen(
+            [*self.command, *args],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            env=dict(env, PYTHONUNBUFFERED="1"),
+            cwd=cwd
+        )
+        for line in process.stdout:
+            on_line(line.rstrip("\n"))
+        return process.wait(), "", ""
+
+
+class _LineWriter:
+    # File-like object that hands complete lines to a callback
+    def __init__(self, on_line):
+        self.on_line = on_line
+        self.pending = ""
+
+    def write(self, text):
+        self.pending += text
+        *lines, self.pending = self.pending.split("\n")
+        for line in lines:
+            self.on_line(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def close(self):
+        if self.pending:
+            self.on_line(self.pending)
+            self.pending = ""
+
+
+class _InProcessRunner:
+    """Runs modal CLI commands inside the current interpreter.
+
+    Each call swaps the process environment, working directory and
+    sys.stdout/sys.stderr, so this is only used inside a _WarmWorker
+    process, which runs one operation at a time and has nothing else
+    running. The app.py process never swaps them.
+    """
+
+    def __init__(self):
+        from modal.cli.entry_point import entrypoint_cli
+        self.entrypoint = entrypoint_cli
+
+    def run(self, args, env, cwd=None, on_line=None):
+        stdout_lines = []
+        stderr_lines = []
+        out = _LineWriter(on_line or stdout_lines.append)
+        err = _LineWriter(on_line or stderr_lines.append)
+        saved_env = {key: os.environ.get(key) for key in env}
+        saved_cwd = os.getcwd()
+        os.environ.update(env)
+        try:
+            if cwd:
+                os.chdir(cwd)
+            with redirect_stdout(out), redirect_stderr(err):
+                returncode = self._invoke(args)
+        finally:
+            os.chdir(saved_cwd)
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            out.close()
+            err.close()
+        if on_line is not None:
+            return returncode, "", ""
+        return returncode, "\n".join(stdout_lines), "\n".join(stderr_lines)
+
+    def _invoke(self, args):
+        import click
+        try:
+            self.entrypoint.main(args=list(args), prog_name="modal", standalone_mode=False)
+            return 0
+        except SystemExit as e:
+            if e.code is None:
+                return 0
+            return e.code if isinstance(e.code, int) else 1
+        except click.exceptions.ClickException as e:
+            e.show()
+            return e.exit_code
+        except click.exceptions.Abort:
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+
+
+class _WarmWorker:
+    # One long-lived `python modal_backend.py --worker` process
+    def __init__(self):
+        self.process = None
+        self.start()
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+        )
+
+    def request(self, args, env, cwd, on_line):
+        if self.process.poll() is not None:
+            self.start()
+        try:
+            self.process.stdin.write(json.dumps({
+                "args": list(args), "env": env, "cwd": cwd, "stream": on_line is not None
+            }) + "\n")
+            self.process.stdin.flush()
+            for raw in self.process.stdout:
+                message = json.loads(raw)
+                if "line" in message:
+                    on_line(message["line"])
+                else:
+                    return message["returncode"], message["stdout"], message["stderr"]
+        except (BrokenPipeError, ValueError):
+            pass
+        # The worker died mid-request; replace it for the next caller
+        self.close()
+        self.start()
+        return 1, "", "modal worker process exited unexpectedly"
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class WarmWorkerBackend(ModalBackend):
+    """Pool of persistent worker processes that keep modal imported.
+
+    Each worker runs the modal CLI in-process, one operation at a time, so
+    interpreter start-up and the modal import are paid once per worker
+    rather than per call. Operations in different workers run in parallel,
+    and the app.py process's environment, cwd and stdout are never touched.
+    """
+
+    def __init__(self, env_factory=None, workers=MODAL_BACKEND_WORKERS):
+        super().__init__(env_factory)
+        self.workers = [_WarmWorker() for _ in range(max(1, workers))]
+        self.idle = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+
+    def run(self, args, env, cwd=None, on_line=None):
+        worker = self.idle.get()
+        try:
+            return worker.request(args, env, cwd, on_line)
+        finally:
+            self.idle.put(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+class FakeBackend(ModalBackend):
+    """In-memory stand-in for modal, for tests and local benchmarks."""
+
+    def __init__(self, env_factory=None, latency=0.0):
+        super().__init__(env_factory)
+        self.latency = latency
+        self.apps = {}
+        self.lock = threading.Lock()
+
+    def run(self, args, env, cwd=None, on_line=None):
+        if self.latency:
+            time.sleep(self.latency)
+        lines = []
+        returncode = 0
+        if args[0] == "deploy":
+            name = env.get("MODAL_APP_NAME", "web")
+            with self.lock:
+                self.apps[name] = "deployed"
+            lines = [f"Deploying {name} from {cwd or os.getcwd()}", "App deployed!"]
+        elif args[:2] == ["app", "show"]:
+            with self.lock:
+                state = self.apps.get(args[2])
+            if state is None:
+                return 1, "", f"App {args[2]} not found"
+            lines = [f"{args[2]}: {state}"]
+        elif args[:2] == ["app", "stop"]:
+            with self.lock:
+                found = self.apps.pop(args[2], None) is not None
+            returncode = 0 if found else 1
+            lines = [f"Stopped {args[2]}" if found else f"App {args[2]} not found"]
+        elif args[:2] == ["app", "list"]:
+            with self.lock:
+                apps = [{"Description": name, "State": state} for name, state in self.apps.items()]
+            lines = [json.dumps(apps)]
+        else:
+            return 2, "", f"Unsupported command: {' '.join(args)}"
+        if on_line is not None:
+            for line in lines:
+                on_line(line)
+            return returncode, "", ""
+        return returncode, "\n".join(lines), ""
+
+
+def create_backend(kind=MODAL_BACKEND, env_factory=None):
+    if kind == "cli":
+        return CliBackend(env_factory)
+    if kind == "worker":
+        return WarmWorkerBackend(env_factory)
+    if kind == "fake":
+        return FakeBackend(env_factory)
+    raise ValueError(f"Unknown modal backend: {kind}")
+
+
+def _worker_main():
+    # Requests arrive as JSON lines on stdin; replies go to a private copy of
+    # stdout so stray prints from modal cannot corrupt the protocol
+    channel = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    runner = _InProcessRunner()
+
+    def send(message):
+        channel.write(json.dumps(message) + "\n")
+
+    for raw in sys.stdin:
+        request = json.loads(raw)
+        on_line = (lambda line: send({"line": line})) if request["stream"] else None
+        returncode, stdout, stderr = runner.run(request["args"], request["env"], request["cwd"], on_line)
+        send({"returncode": returncode, "stdout": stdout, "stderr": stderr})
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["--worker"]:
+    _worker_main()
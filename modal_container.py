@@ -1,16 +1,104 @@
 import os
 from modal import Image, App, asgi_app
+import hmac
+import json
+import asyncio
+import collections
 import subprocess
 import threading
 import time
-import socket
-from urllib.parse import urlparse
+from performance_profiles import PROFILE_ENV, profile_from_env, function_options
 
 # Use an environment variable for the app name, defaulting to "web"
 app_name = os.environ.get("MODAL_APP_NAME", "web")
 # Create a Modal app with the provided app name
 app = App(app_name)
 
+# Proxy tuning settings. Any PROXY_* variable set when running `modal deploy`
+# is baked into the image environment so the container sees the same values.
+PROXY_SETTINGS = {key: value for key, value in os.environ.items() if key.startswith("PROXY_")}
+
+# Resources and scaling of web_app, from the performance profile app.py
+# passes in MODAL_PERFORMANCE_PROFILE (see performance_profiles.py)
+PERFORMANCE_PROFILE = profile_from_env()
+FUNCTION_OPTIONS, CONCURRENCY_OPTIONS = function_options(PERFORMANCE_PROFILE)
+
+# Upstream connection pool settings for the galaxybackend
+PROXY_MAX_CONNECTIONS = int(os.environ.get("PROXY_MAX_CONNECTIONS", "100"))
+PROXY_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("PROXY_MAX_KEEPALIVE_CONNECTIONS", "20"))
+PROXY_KEEPALIVE_EXPIRY = float(os.environ.get("PROXY_KEEPALIVE_EXPIRY", "30"))
+PROXY_CONNECT_TIMEOUT = float(os.environ.get("PROXY_CONNECT_TIMEOUT", "5"))
+PROXY_POOL_TIMEOUT = float(os.environ.get("PROXY_POOL_TIMEOUT", "10"))
+
+# Per-route read timeouts in seconds
+PROXY_GET_TIMEOUT = float(os.environ.get("PROXY_GET_TIMEOUT", "30"))
+PROXY_POST_TIMEOUT = float(os.environ.get("PROXY_POST_TIMEOUT", "60"))
+
+# Request bodies up to this many bytes (by Content-Length) are read before
+# forwarding so a 307/308 redirect from the backend can resend them; larger
+# or chunked bodies are streamed and redirects are passed back to the client
+PROXY_REPLAY_BODY_BYTES = int(os.environ.get("PROXY_REPLAY_BODY_BYTES", str(64 * 1024)))
+
+# Background readiness probe settings in seconds
+PROXY_HEALTH_INTERVAL = float(os.environ.get("PROXY_HEALTH_INTERVAL", "2"))
+PROXY_HEALTH_TIMEOUT = float(os.environ.get("PROXY_HEALTH_TIMEOUT", "1"))
+# While a backend is down it is re-probed with exponential backoff from
+# PROXY_READY_BACKOFF up to PROXY_HEALTH_INTERVAL, so it is picked up soon
+# after it starts listening
+PROXY_READY_BACKOFF = float(os.environ.get("PROXY_READY_BACKOFF", "0.05"))
+# How long a request waits for a backend during cold start before a 503
+PROXY_READY_WAIT = float(os.environ.get("PROXY_READY_WAIT", "10"))
+# Warn if no backend is ready this long after startup
+PROXY_STARTUP_TIMEOUT = float(os.environ.get("PROXY_STARTUP_TIMEOUT", "60"))
+
+# Admission control: requests forwarded at once, requests allowed to wait
+# for a slot (beyond that they are shed with a 503), the total time a request
+# may spend waiting for a slot and a ready backend, and the Retry-After value
+# sent with 503s
+PROXY_MAX_CONCURRENT = int(os.environ.get("PROXY_MAX_CONCURRENT", "64"))
+PROXY_MAX_QUEUE = int(os.environ.get("PROXY_MAX_QUEUE", "256"))
+PROXY_QUEUE_DEADLINE = float(os.environ.get("PROXY_QUEUE_DEADLINE", "15"))
+PROXY_RETRY_AFTER = int(os.environ.get("PROXY_RETRY_AFTER", "2"))
+
+# Response cache for proxied GETs, off unless rules are given: JSON mapping
+# path prefix to the longest time in seconds a response may be cached, e.g.
+# {"/static/": 3600, "/config": 30}. Bounded by total bytes and per entry.
+PROXY_CACHE_RULES = json.loads(os.environ.get("PROXY_CACHE_RULES", "{}"))
+PROXY_CACHE_MAX_BYTES = int(os.environ.get("PROXY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROXY_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("PROXY_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+# Response compression: on/off, smallest body compressed, and the level for
+# each encoding (brotli and zstd are used when their packages are installed)
+PROXY_COMPRESSION = os.environ.get("PROXY_COMPRESSION", "1") == "1"
+PROXY_COMPRESSION_MIN_SIZE = int(os.environ.get("PROXY_COMPRESSION_MIN_SIZE", "1024"))
+PROXY_GZIP_LEVEL = int(os.environ.get("PROXY_GZIP_LEVEL", "6"))
+PROXY_BROTLI_QUALITY = int(os.environ.get("PROXY_BROTLI_QUALITY", "4"))
+PROXY_ZSTD_LEVEL = int(os.environ.get("PROXY_ZSTD_LEVEL", "3"))
+
+# WebSocket proxying: concurrent connections, largest message in bytes and
+# messages buffered from the backend before it is pushed back on
+PROXY_MAX_WEBSOCKETS = int(os.environ.get("PROXY_MAX_WEBSOCKETS", "256"))
+PROXY_WS_MAX_MESSAGE = int(os.environ.get("PROXY_WS_MAX_MESSAGE", str(1024 * 1024)))
+PROXY_WS_MAX_QUEUE = int(os.environ.get("PROXY_WS_MAX_QUEUE", "16"))
+
+# Bearer token that lets a scraper read /metrics without an allowed Origin
+# (when unset, /metrics is restricted like every other path)
+PROXY_METRICS_TOKEN = os.environ.get("PROXY_METRICS_TOKEN", "")
+
+# Number of galaxybackend processes, on consecutive ports from
+# PROXY_BACKEND_BASE_PORT. Each process is given its port in the PORT
+# environment variable.
+PROXY_BACKEND_WORKERS = int(os.environ.get("PROXY_BACKEND_WORKERS", "1"))
+PROXY_BACKEND_BASE_PORT = int(os.environ.get("PROXY_BACKEND_BASE_PORT", "7860"))
+PROXY_BACKEND_SCRIPT = os.environ.get("PROXY_BACKEND_SCRIPT", "/galaxybackend/app.py")
+
+# Logging pipeline settings: queue size (records beyond it are dropped) and
+# records per second kept for each high-volume event
+PROXY_LOG_QUEUE_SIZE = int(os.environ.get("PROXY_LOG_QUEUE_SIZE", "10000"))
+PROXY_LOG_EVENT_RATE = float(os.environ.get("PROXY_LOG_EVENT_RATE", "20"))
+# Requests slower than this (milliseconds) get an unsampled slow_request record
+PROXY_SLOW_REQUEST_MS = float(os.environ.get("PROXY_SLOW_REQUEST_MS", "1000"))
+
 # Create a Docker image directly from the Docker Hub image
 image = Image.from_registry(
     "bharanidharan/galaxykick:v100",
@@ -21,55 +109,430 @@ image = Image.from_registry(
     "flask-cors",
     "httpx",
     "fastapi",
-    "uvicorn"
+    "uvicorn",
+    "websockets>=14",
+    "brotli",
+    "zstandard"
+).env(dict(PROXY_SETTINGS, **{PROFILE_ENV: json.dumps(PERFORMANCE_PROFILE, sort_keys=True)})).add_local_python_source(
+    "origin_matcher", "structured_logging", "response_cache", "compression", "metrics", "request_timing",
+    "performance_profiles"
 )
 
-# Function to check if a port is open
-def is_port_open(port, host='localhost', timeout=1):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(timeout)
-    result = sock.connect_ex((host, port))
-    sock.close()
-    return result == 0
-
-# This function will execute the container's entrypoint/command and keep it running
-def run_container_entrypoint():
-    while True:
-        print("Starting container service...")
+# Background monitor that keeps a cached ready/not-ready state for the backend
+class BackendMonitor:
+    """Probe the backend port on an interval so request handlers only read a flag."""
+
+    def __init__(self, port, host='localhost', interval=2.0, timeout=1.0, backoff=0.05, on_change=None):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.backoff = backoff
+        # Called with the monitor whenever the ready state flips
+        self.on_change = on_change
+        self.ready = False
+        self.last_checked = None
+        self.last_changed = None
+        self._wakeup = None
+        self._task = None
+
+    async def start(self):
+        # Probe once up front so the cached state is valid before serving
+        self._set_ready(await self.probe())
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def report_failure(self):
+        # Called when a proxied request could not connect; mark the backend as
+        # down right away and re-probe without waiting for the next interval
+        self._set_ready(False)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def probe(self):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "last_checked": self.last_checked,
+            "last_changed": self.last_changed
+        }
+
+    def _set_ready(self, ready):
+        now = time.time()
+        self.last_checked = now
+        if ready != self.ready:
+            self.ready = ready
+            self.last_changed = now
+            if self.on_change is not None:
+                self.on_change(self)
+
+    async def _run(self):
+        delay = self.backoff
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval if self.ready else delay)
+            except asyncio.TimeoutError:
+                pass
+            self._set_ready(await self.probe())
+            delay = self.backoff if self.ready else min(delay * 2, self.interval)
+
+# Concurrency limit in front of the backend with a bounded FIFO wait queue
+class AdmissionControl:
+    """At most `limit` requests hold a slot; up to `max_queue` more wait for
+    one in arrival order. A released slot is handed straight to the oldest
+    waiter, so queued requests cannot be overtaken by new arrivals."""
+
+    def __init__(self, limit, max_queue):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiters = collections.deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self, deadline):
+        """Take a slot before `deadline` (event loop time). Returns False
+        right away if the queue is full, or when the deadline passes."""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self.waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self.waiters.append(waiter)
+        self.queued += 1
         try:
-            if os.path.exists("/galaxybackend/app.py"):
-                process = subprocess.Popen(["python3", "/galaxybackend/app.py"])
-                process.wait()
-                print("Container service process exited with code", process.returncode)
+            await asyncio.wait_for(waiter, deadline - loop.time())
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended; pass it on
+                self.release()
             else:
-                print("Warning: /galaxybackend/app.py not found")
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                return False
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": len(self.waiters),
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+# One supervised galaxybackend process with its own health state
+class BackendWorker:
+    """Keeps one backend process running on a fixed port and tracks its load."""
+
+    SCRIPT = PROXY_BACKEND_SCRIPT
+
+    def __init__(self, index, port, interval=2.0, timeout=1.0, backoff=0.05, on_change=None):
+        self.index = index
+        self.port = port
+        self.monitor = BackendMonitor(port, interval=interval, timeout=timeout, backoff=backoff, on_change=on_change)
+        self.base_url = f"http://localhost:{port}"
+        # Requests currently proxied to this worker
+        self.active = 0
+        self.running = False
+        self.pid = None
+        self.process = None
+        self.stopping = False
+        self.restarts = 0
+
+    @property
+    def available(self):
+        # Out of rotation while its process is down or restarting, until the
+        # monitor sees the port accepting connections again
+        return self.running and self.monitor.ready
+
+    # This function will execute the container's entrypoint/command and keep it running
+    def supervise(self):
+        while not self.stopping:
+            print(f"Starting container service on port {self.port}...")
+            try:
+                if os.path.exists(self.SCRIPT):
+                    process = subprocess.Popen(
+                        ["python3", self.SCRIPT],
+                        env=dict(os.environ, PORT=str(self.port))
+                    )
+                    self.process = process
+                    self.pid = process.pid
+                    self.running = True
+                    process.wait()
+                    self.running = False
+                    print(f"Container service on port {self.port} exited with code", process.returncode)
+                else:
+                    print(f"Warning: {self.SCRIPT} not found")
+                    break
+            except Exception as e:
+                print(f"Error starting container process on port {self.port}: {e}")
+            self.running = False
+            if self.stopping:
                 break
-        except Exception as e:
-            print(f"Error starting container process: {e}")
-        time.sleep(5)  # Wait 5 seconds before restarting
+            self.restarts += 1
+            time.sleep(5)  # Wait 5 seconds before restarting
 
-# Create a web app that serves the Docker container
-@app.function(
-    image=image,
-    min_containers=1,
-    max_containers=1,  # Added to prevent autoscaling
-    cpu=1.5,
-    memory=2048
-)
-@asgi_app()
-def web_app():
-    from fastapi import FastAPI, Request, HTTPException
-    from fastapi.responses import StreamingResponse, JSONResponse
+    def terminate(self):
+        # Stop supervising and end the process, e.g. when the app shuts down
+        self.stopping = True
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def snapshot(self):
+        return dict(
+            self.monitor.snapshot(),
+            port=self.port,
+            pid=self.pid,
+            running=self.running,
+            available=self.available,
+            active=self.active,
+            restarts=self.restarts
+        )
+
+# Pool of backend processes balanced by least connections
+class BackendPool:
+    def __init__(self, workers, base_port, interval=2.0, timeout=1.0, backoff=0.05):
+        self.workers = [
+            BackendWorker(
+                index, base_port + index, interval=interval, timeout=timeout,
+                backoff=backoff, on_change=self._worker_changed
+            )
+            for index in range(max(1, workers))
+        ]
+        # Rotates the starting point so ties do not always go to the first worker
+        self._turn = 0
+        # Set while at least one worker is in rotation; created on the event loop in start()
+        self._ready_event = None
+        # Cold-start phase -> seconds since the pool was created
+        self.created_at = time.monotonic()
+        self.phases = {}
+
+    def mark(self, phase):
+        """Record when a cold-start phase was first reached."""
+        if phase not in self.phases:
+            self.phases[phase] = round(time.monotonic() - self.created_at, 3)
+        return self.phases[phase]
+
+    def start_processes(self):
+        for worker in self.workers:
+            thread = threading.Thread(target=worker.supervise, name=f"backend-{worker.port}")
+            thread.daemon = True
+            thread.start()
+        self.mark("processes_started")
+
+    async def start(self):
+        self._ready_event = asyncio.Event()
+        await asyncio.gather(*(worker.monitor.start() for worker in self.workers))
+        self.mark("monitors_started")
+
+    async def wait_ready(self, timeout):
+        """Wait until a worker is in rotation; False if timeout seconds pass first."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.ready:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._ready_event is None:
+                return False
+            self._ready_event.clear()
+            try:
+                await asyncio.wait_for(self._ready_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return self.ready
+        return True
+
+    def _worker_changed(self, monitor):
+        if not monitor.ready:
+            return
+        self.mark(f"worker_{monitor.port}_ready")
+        self.mark("first_worker_ready")
+        if all(worker.monitor.ready for worker in self.workers):
+            self.mark("all_workers_ready")
+        if self._ready_event is not None:
+            self._ready_event.set()
+
+    async def stop(self):
+        await asyncio.gather(*(worker.monitor.stop() for worker in self.workers))
+
+    def stop_processes(self):
+        for worker in self.workers:
+            worker.terminate()
+
+    @property
+    def ready(self):
+        return any(worker.available for worker in self.workers)
+
+    def acquire(self):
+        """Pick the available worker with the fewest in-flight requests, or None."""
+        candidates = [worker for worker in self.workers if worker.available]
+        if not candidates:
+            return None
+        offset = self._turn % len(candidates)
+        self._turn += 1
+        worker = min(candidates[offset:] + candidates[:offset], key=lambda worker: worker.active)
+        worker.active += 1
+        return worker
+
+    def release(self, worker):
+        worker.active -= 1
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "cold_start": self.phases,
+            "workers": [worker.snapshot() for worker in self.workers]
+        }
+
+# Concurrent requests per container, when the profile sets it
+def input_concurrency(function):
+    if CONCURRENCY_OPTIONS is None:
+        return function
+    from modal import concurrent
+    return concurrent(**CONCURRENCY_OPTIONS)(function)
+
+# Build the FastAPI app that serves the Docker container. A plain function,
+# so benchmarks and tests can run it without Modal's wrapper.
+def create_web_app():
+    from fastapi import FastAPI, Request, HTTPException, WebSocket
+    from fastapi.responses import StreamingResponse, JSONResponse, Response
     from fastapi.middleware.cors import CORSMiddleware
+    from starlette.background import BackgroundTask
     import httpx
-    import logging
+    from websockets.asyncio.client import connect as websocket_connect
+    from websockets.exceptions import InvalidHandshake
+    from origin_matcher import OriginMatcher
+    from structured_logging import LogPipeline
+    from response_cache import ResponseCache, CachedResponse, NOT_MODIFIED_HEADERS, etag_matches
+    from compression import CompressionMiddleware
+    from metrics import MetricsRegistry, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    from request_timing import ServerTimingMiddleware
     
-    # Configure logging
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger("galaxykick-api")
+    # Configure logging: JSON records are written by a background thread, and
+    # per-request events are capped per second so they cannot flood stdout
+    log_pipeline = LogPipeline(
+        "galaxykick-api",
+        sampled_events=(
+            "access_allowed", "access_denied", "forwarding", "upstream_response",
+            "backend_unavailable", "load_shed", "request_timing"
+        ),
+        event_rate=PROXY_LOG_EVENT_RATE,
+        queue_size=PROXY_LOG_QUEUE_SIZE
+    )
+    log_pipeline.start()
+    logger = log_pipeline.logger
     
     fastapp = FastAPI()
     
+    # Shared keep-alive client for the galaxybackend, created at startup
+    fastapp.state.upstream_client = None
+    # Number of requests currently waiting on or using the upstream pool
+    fastapp.state.upstream_active = 0
+    
+    # Backend processes, each with cached readiness refreshed in the background
+    backend_pool = BackendPool(
+        PROXY_BACKEND_WORKERS, PROXY_BACKEND_BASE_PORT,
+        interval=PROXY_HEALTH_INTERVAL, timeout=PROXY_HEALTH_TIMEOUT, backoff=PROXY_READY_BACKOFF
+    )
+    
+    # Limits how many requests reach the backend at once
+    admission = AdmissionControl(PROXY_MAX_CONCURRENT, PROXY_MAX_QUEUE)
+    
+    # Cache for GET paths that opted in through PROXY_CACHE_RULES
+    response_cache = ResponseCache(
+        PROXY_CACHE_RULES, max_bytes=PROXY_CACHE_MAX_BYTES, max_entry_bytes=PROXY_CACHE_MAX_ENTRY_BYTES
+    )
+    
+    # Metrics served on /metrics. Hot-path recording is a dict lookup and an
+    # increment; pool and queue levels are read only when scraped.
+    metrics = MetricsRegistry()
+    upstream_connect_time = metrics.histogram(
+        "proxy_upstream_connect_seconds", "Time to open a new TCP connection to the backend"
+    )
+    upstream_ttfb = metrics.histogram(
+        "proxy_upstream_ttfb_seconds", "Time from sending the request to the backend's response headers", ("method",)
+    )
+    upstream_duration = metrics.histogram(
+        "proxy_upstream_duration_seconds", "Time from sending the request until the backend response is closed", ("method",)
+    )
+    upstream_errors = metrics.counter("proxy_upstream_errors_total", "Failed backend requests", ("kind",))
+    rejections = metrics.counter("proxy_rejections_total", "Requests refused by the proxy", ("reason",))
+    metrics.counter(
+        "proxy_backend_restarts_total", "Backend process restarts",
+        ("port",), collect=lambda: {(str(worker.port),): worker.restarts for worker in backend_pool.workers}
+    )
+    metrics.gauge(
+        "proxy_backend_available", "Whether a backend worker is in rotation",
+        ("port",), collect=lambda: {(str(worker.port),): int(worker.available) for worker in backend_pool.workers}
+    )
+    metrics.gauge(
+        "proxy_backend_active_requests", "Requests in flight per backend worker",
+        ("port",), collect=lambda: {(str(worker.port),): worker.active for worker in backend_pool.workers}
+    )
+    metrics.gauge(
+        "proxy_admission_requests", "Requests holding or waiting for an admission slot",
+        ("state",), collect=lambda: {("active",): admission.active, ("waiting",): len(admission.waiters)}
+    )
+    metrics.counter(
+        "proxy_cache_lookups_total", "Response cache lookups",
+        ("result",), collect=lambda: {
+            ("hit",): response_cache.hits, ("miss",): response_cache.misses,
+            ("coalesced",): response_cache.coalesced, ("not_modified",): response_cache.not_modified
+        }
+    )
+    metrics.gauge("proxy_websockets_active", "Open proxied WebSocket connections", collect=lambda: {(): websocket_stats["active"]})
+    
+    # Per-route upstream timeouts
+    get_timeout = httpx.Timeout(PROXY_GET_TIMEOUT, connect=PROXY_CONNECT_TIMEOUT, pool=PROXY_POOL_TIMEOUT)
+    post_timeout = httpx.Timeout(PROXY_POST_TIMEOUT, connect=PROXY_CONNECT_TIMEOUT, pool=PROXY_POOL_TIMEOUT)
+    
     # Define allowed origins - exact domains that are allowed
     ALLOWED_ORIGINS = [
         "galaxykicklock.web.app",
@@ -80,123 +543,315 @@ def web_app():
         "modal.com"
     ]
     
-    # Convert to a set for faster lookups
-    ALLOWED_ORIGINS_SET = set(ALLOWED_ORIGINS)
+    # Compiled matcher for exact domains and their subdomains, with a cache of
+    # Origin/Referer header decisions
+    origin_matcher = OriginMatcher(ALLOWED_ORIGINS, allow_subdomains=True, strip_www=True)
     
-    # Add full URLs to CORS middleware (both http and https)
-    CORS_ALLOWED_ORIGINS = []
-    for origin in ALLOWED_ORIGINS:
-        CORS_ALLOWED_ORIGINS.append(f"https://{origin}")
-        CORS_ALLOWED_ORIGINS.append(f"http://{origin}")
-        # Also include subdomains
-        if "." in origin:
-            CORS_ALLOWED_ORIGINS.append(f"https://*.{origin}")
-            CORS_ALLOWED_ORIGINS.append(f"http://*.{origin}")
-    
-    # Add CORS middleware with restricted origins
+    # Add CORS middleware with restricted origins (http and https, including subdomains)
     fastapp.add_middleware(
         CORSMiddleware,
-        allow_origins=CORS_ALLOWED_ORIGINS,
+        allow_origin_regex=origin_matcher.origin_regex(),
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
     )
     
-    # Global variable to track container service status
-    container_service_ready = False
+    # Compress responses for clients that accept it; upstream bodies that are
+    # already encoded pass through as they are
+    compression_stats = {}
+    if PROXY_COMPRESSION:
+        fastapp.add_middleware(
+            CompressionMiddleware,
+            minimum_size=PROXY_COMPRESSION_MIN_SIZE,
+            gzip_level=PROXY_GZIP_LEVEL,
+            brotli_quality=PROXY_BROTLI_QUALITY,
+            zstd_level=PROXY_ZSTD_LEVEL,
+            stats=compression_stats
+        )
+    
+    # Latency covers compression and CORS as well
+    fastapp.add_middleware(MetricsMiddleware, registry=metrics, prefix="proxy_http")
+    
+    # Phase timings for every request, logged once the response is finished
+    def log_request_timing(record):
+        if record["total_ms"] >= PROXY_SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s %s: %.1f ms", record["method"], record["path"], record["total_ms"],
+                extra={"event": "slow_request", "fields": record}
+            )
+        else:
+            logger.info(
+                "Request %s %s: %.1f ms", record["method"], record["path"], record["total_ms"],
+                extra={"event": "request_timing", "fields": record}
+            )
+    
+    # Outermost: assigns the request ID and adds Server-Timing and X-Request-ID
+    fastapp.add_middleware(ServerTimingMiddleware, on_complete=log_request_timing)
+    
+    @fastapp.on_event("startup")
+    async def startup_event():
+        # Start the container service processes in background threads. Startup
+        # does not wait for them: requests wait on backend_pool.wait_ready
+        # instead, and the readiness watcher below logs the cold-start timings.
+        backend_pool.start_processes()
+    
+    async def watch_readiness():
+        logger.info("Waiting for container service to start...")
+        if await backend_pool.wait_ready(PROXY_STARTUP_TIMEOUT):
+            logger.info(
+                "Container service is ready after %s seconds", backend_pool.phases.get("first_worker_ready"),
+                extra={"event": "cold_start", "fields": {"phases": dict(backend_pool.phases)}}
+            )
+        else:
+            logger.warning(
+                "Container service not detected after %s seconds, still waiting", PROXY_STARTUP_TIMEOUT,
+                extra={"event": "cold_start", "fields": {"phases": dict(backend_pool.phases)}}
+            )
     
     @fastapp.on_event("startup")
-    def startup_event():
-        global container_service_ready
+    async def open_upstream_client():
+        # One connection pool for the lifetime of the app, so requests reuse
+        # keep-alive connections to the backend instead of reconnecting
+        fastapp.state.upstream_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=PROXY_MAX_CONNECTIONS,
+                max_keepalive_connections=PROXY_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=PROXY_KEEPALIVE_EXPIRY
+            ),
+            timeout=get_timeout
+        )
+        logger.info(
+            "Upstream pool ready (max_connections=%s, max_keepalive=%s, keepalive_expiry=%ss)",
+            PROXY_MAX_CONNECTIONS, PROXY_MAX_KEEPALIVE_CONNECTIONS, PROXY_KEEPALIVE_EXPIRY
+        )
+        await backend_pool.start()
+        fastapp.state.readiness_watcher = asyncio.get_running_loop().create_task(watch_readiness())
+    
+    @fastapp.on_event("shutdown")
+    async def close_upstream_client():
+        fastapp.state.readiness_watcher.cancel()
+        await backend_pool.stop()
+        client = fastapp.state.upstream_client
+        fastapp.state.upstream_client = None
+        if client is not None:
+            await client.aclose()
+        backend_pool.stop_processes()
+        log_pipeline.stop()
+    
+    # Headers that only describe a single connection and must not be forwarded
+    HOP_BY_HOP_HEADERS = {
+        "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+        "te", "trailer", "trailers", "transfer-encoding", "upgrade"
+    }
+    
+    # Methods proxied to the backend (OPTIONS is answered by the proxy), and
+    # the ones forwarded without a request body
+    PROXY_METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"]
+    BODYLESS_METHODS = {"GET", "HEAD"}
+    
+    # WebSocket connections currently proxied and message counters
+    websocket_stats = {"active": 0, "opened": 0, "rejected": 0, "to_backend": 0, "to_client": 0}
+    
+    # Helper function to drop hop-by-hop headers, including any the
+    # Connection header names, from a header mapping
+    def strip_hop_by_hop(headers):
+        hop_by_hop = HOP_BY_HOP_HEADERS | {
+            token.strip().lower() for token in headers.get("connection", "").split(",") if token.strip()
+        }
+        return {key: value for key, value in headers.items() if key.lower() not in hop_by_hop}
+    
+    # Response headers uvicorn always adds itself; the backend's copies would
+    # be sent alongside them
+    SERVER_SET_HEADERS = {"date", "server"}
+    
+    # Helper function to build the client-facing headers of a backend response
+    def response_headers(headers):
+        return {key: value for key, value in strip_hop_by_hop(headers).items() if key.lower() not in SERVER_SET_HEADERS}
+    
+    # Starlette skips the background task when streaming raises, including
+    # ClientDisconnect on ASGI 2.4 servers, where the body may never have been
+    # started; run it on every exit path instead
+    class UpstreamStreamingResponse(StreamingResponse):
+        async def __call__(self, scope, receive, send):
+            try:
+                await super().__call__(scope, receive, send)
+            finally:
+                await self.background()
+    
+    # Helper function to stream a request to the backend and its response back.
+    # The request body is piped from the ASGI receive channel and the response
+    # body is relayed chunk by chunk, so memory per request stays bounded
+    # regardless of payload size. Raw (undecoded) bytes are relayed so the
+    # upstream Content-Encoding and Content-Length stay valid. The admission
+    # slot and worker taken by admit() are released once the response is closed.
+    # A streamed body cannot be sent twice, so redirects are then relayed with
+    # any Location on the backend itself made relative.
+    async def stream_upstream(method, worker, url, timeout, timing, params=None, headers=None, content=None,
+                              follow_redirects=True):
+        client = fastapp.state.upstream_client
+        fastapp.state.upstream_active += 1
+        connect_started = None
         
-        # Start the container service in a background thread
-        thread = threading.Thread(target=run_container_entrypoint)
-        thread.daemon = True
-        thread.start()
+        # httpx trace hook; only fires when a new connection is opened
+        async def trace(event, info):
+            nonlocal connect_started
+            if event == "connection.connect_tcp.started":
+                connect_started = time.perf_counter()
+            elif event == "connection.connect_tcp.complete" and connect_started is not None:
+                elapsed = time.perf_counter() - connect_started
+                upstream_connect_time.observe(elapsed)
+                timing.add("connect", elapsed)
         
-        # Wait for container service to be ready with a timeout
-        max_wait_time = 60  # Maximum wait time in seconds
-        wait_interval = 2   # Check every 2 seconds
-        total_waited = 0
+        started = time.perf_counter()
+        try:
+            upstream_request = client.build_request(
+                method, url, params=params, headers=headers, content=content, timeout=timeout,
+                extensions={"trace": trace}
+            )
+            response = await client.send(upstream_request, stream=True, follow_redirects=follow_redirects)
+        except BaseException:
+            fastapp.state.upstream_active -= 1
+            backend_pool.release(worker)
+            admission.release()
+            raise
+        ttfb = time.perf_counter() - started
+        upstream_ttfb.labels(method).observe(ttfb)
+        timing.add("upstream", ttfb, "backend response headers")
+        released = False
         
-        logger.info("Waiting for container service to start...")
-        while total_waited < max_wait_time:
-            if is_port_open(7860):
-                container_service_ready = True
-                logger.info(f"Container service is ready after {total_waited} seconds")
-                break
-            time.sleep(wait_interval)
-            total_waited += wait_interval
-            logger.info(f"Waiting for container service... ({total_waited}/{max_wait_time}s)")
+        # Called from every exit path below, so it must only release once
+        async def close_upstream():
+            nonlocal released
+            if released:
+                return
+            released = True
+            try:
+                await response.aclose()
+            finally:
+                upstream_duration.labels(method).observe(time.perf_counter() - started)
+                fastapp.state.upstream_active -= 1
+                backend_pool.release(worker)
+                admission.release()
         
-        if not container_service_ready:
-            logger.warning("Container service not detected after timeout, proceeding anyway")
+        # Releases as soon as the body ends, including when the backend
+        # resets or times out mid-body
+        async def relay_body():
+            try:
+                async for chunk in response.aiter_raw():
+                    yield chunk
+            finally:
+                await close_upstream()
+        
+        relayed_headers = response_headers(response.headers)
+        location = relayed_headers.get("location", "")
+        if location.startswith(worker.base_url + "/"):
+            relayed_headers["location"] = location[len(worker.base_url):]
+        return response, UpstreamStreamingResponse(
+            content=relay_body(),
+            status_code=response.status_code,
+            headers=relayed_headers,
+            background=BackgroundTask(close_upstream)
+        )
     
-    # Helper function to extract domain from URL
-    def extract_domain(url):
-        if not url:
-            return None
+    # 503 telling the client when to retry
+    def unavailable_response(message):
+        return JSONResponse(
+            status_code=503,
+            content={"error": message},
+            headers={"Retry-After": str(PROXY_RETRY_AFTER)}
+        )
+    
+    # Helper function to admit a request and pick the least busy backend
+    # worker for it. Waiting for a slot and, during cold start or a restart,
+    # for a ready worker share one deadline, so short outages become latency
+    # rather than errors. Returns (worker, None) with a slot held, or
+    # (None, error_response).
+    async def admit(method, path, timing):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PROXY_QUEUE_DEADLINE
+        with timing.phase("queue"):
+            admitted = await admission.acquire(deadline)
+        if not admitted:
+            rejections.labels("load_shed").inc()
+            logger.warning(
+                "Shedding %s /%s: proxy is at capacity", method, path,
+                extra={"event": "load_shed", "fields": admission.stats()}
+            )
+            return None, unavailable_response("Server is busy, try again later")
         
-        # Add scheme if not present
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-            
-        try:
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc
-            
-            # Remove port if present
-            if ':' in domain:
-                domain = domain.split(':')[0]
-                
-            # Remove 'www.' prefix if present
-            if domain.startswith('www.'):
-                domain = domain[4:]
-                
-            return domain
-        except:
-            return None
+        worker = backend_pool.acquire()
+        if worker is None:
+            with timing.phase("ready", "waiting for a backend worker"):
+                if await backend_pool.wait_ready(min(PROXY_READY_WAIT, deadline - loop.time())):
+                    worker = backend_pool.acquire()
+        if worker is None:
+            admission.release()
+            rejections.labels("backend_unavailable").inc()
+            logger.error(
+                "Container service not available for %s /%s", method, path,
+                extra={"event": "backend_unavailable"}
+            )
+            return None, unavailable_response("Container service is not available or still starting")
+        return worker, None
     
-    # Helper function to check if the domain is in allowed list
-    def is_domain_allowed(domain):
-        if not domain:
-            return False
-            
-        # Check exact match
-        if domain in ALLOWED_ORIGINS_SET:
-            return True
-            
-        # Check for subdomain
-        for allowed in ALLOWED_ORIGINS_SET:
-            if domain.endswith('.' + allowed):
-                return True
-                
-        return False
+    # Helper function to report upstream connection pool usage
+    def upstream_pool_stats():
+        in_use = 0
+        idle = 0
+        client = fastapp.state.upstream_client
+        if client is not None:
+            try:
+                for connection in client._transport._pool.connections:
+                    if connection.is_idle():
+                        idle += 1
+                    else:
+                        in_use += 1
+            except AttributeError:
+                # Transport internals differ between httpx versions
+                pass
+        return {
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": max(0, fastapp.state.upstream_active - in_use),
+            "max_connections": PROXY_MAX_CONNECTIONS,
+            "max_keepalive_connections": PROXY_MAX_KEEPALIVE_CONNECTIONS,
+            "keepalive_expiry": PROXY_KEEPALIVE_EXPIRY
+        }
     
-    # Helper function to check if the origin is allowed
+    # Helper function to check if the origin is allowed, timed as the
+    # "origin" phase for HTTP requests
     def is_origin_allowed(request: Request) -> bool:
+        timing = request.scope.get("timing")
+        if timing is None:
+            return check_origin(request)
+        with timing.phase("origin"):
+            return check_origin(request)
+    
+    def check_origin(request):
         # Extract and check Origin header
         origin = request.headers.get("origin")
-        origin_domain = extract_domain(origin)
-        if origin_domain and is_domain_allowed(origin_domain):
-            logger.info(f"Access allowed for origin: {origin}")
+        if origin and origin_matcher.allows(origin):
+            logger.info("Access allowed for origin: %s", origin, extra={"event": "access_allowed"})
             return True
             
         # If no origin, check Referer as fallback
         referer = request.headers.get("referer")
-        referer_domain = extract_domain(referer)
-        if referer_domain and is_domain_allowed(referer_domain):
-            logger.info(f"Access allowed for referer: {referer}")
+        if referer and origin_matcher.allows(referer):
+            logger.info("Access allowed for referer: %s", referer, extra={"event": "access_allowed"})
             return True
             
         # No valid origin or referer with allowed domain found
-        logger.warning(f"Access denied. Origin: {origin}, Referer: {referer}")
+        rejections.labels("origin").inc()
+        logger.warning(
+            "Access denied. Origin: %s, Referer: %s", origin, referer,
+            extra={"event": "access_denied", "fields": {"origin": origin, "referer": referer}}
+        )
         return False
     
     @fastapp.get("/")
     async def root(request: Request):
         if not is_origin_allowed(request):
-            logger.warning(f"Access denied from origin: {request.headers.get('origin', 'Unknown')}")
+            logger.warning("Access denied from origin: %s", request.headers.get("origin", "Unknown"), extra={"event": "access_denied"})
             raise HTTPException(status_code=403, detail="Access denied: Origin not allowed")
         return {"message": "GalaxyKick API is running. Access endpoints using the proper paths."}
     
@@ -204,127 +859,330 @@ def web_app():
     async def status(request: Request):
         # Even status endpoint should be restricted
         if not is_origin_allowed(request):
-            logger.warning(f"Access denied for status check from origin: {request.headers.get('origin', 'Unknown')}")
+            logger.warning(
+                "Access denied for status check from origin: %s", request.headers.get("origin", "Unknown"),
+                extra={"event": "access_denied"}
+            )
             raise HTTPException(status_code=403, detail="Access denied: Origin not allowed")
             
-        is_ready = is_port_open(7860)
+        is_ready = backend_pool.ready
         return {
             "api_status": "running",
             "container_service": "running" if is_ready else "not ready",
-            "container_port_open": is_ready
+            "container_port_open": is_ready,
+            "health": backend_pool.snapshot(),
+            "upstream_pool": upstream_pool_stats(),
+            "admission": admission.stats(),
+            "response_cache": response_cache.stats(),
+            "websockets": dict(websocket_stats),
+            "compression": dict(compression_stats),
+            "logging": log_pipeline.stats()
         }
     
-    @fastapp.get("/{path:path}")
-    async def get_route(path: str, request: Request):
-        # Validate origin before processing request
-        if not is_origin_allowed(request):
-            logger.warning(f"Access denied for GET /{path} from origin: {request.headers.get('origin', 'Unknown')}")
+    @fastapp.get("/metrics")
+    async def metrics_route(request: Request):
+        # Scrapers authenticate with PROXY_METRICS_TOKEN; browsers need an allowed origin
+        authorized = bool(PROXY_METRICS_TOKEN) and hmac.compare_digest(
+            request.headers.get("authorization", "").encode(), f"Bearer {PROXY_METRICS_TOKEN}".encode()
+        )
+        if not authorized and not is_origin_allowed(request):
             raise HTTPException(status_code=403, detail="Access denied: Origin not allowed")
-            
-        url = f"http://localhost:7860/{path}"
-        params = dict(request.query_params)
-        
-        # Check if container service is available
-        if not is_port_open(7860):
-            logger.error(f"Container service not available on port 7860 for GET /{path}")
-            return JSONResponse(
-                status_code=503,
-                content={"error": "Container service is not available or still starting"}
+        return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+    
+    # Headers describing the one backend request that filled a cache entry,
+    # which would be misleading when replayed
+    PER_REQUEST_HEADERS = {"server-timing", "x-request-id"}
+    
+    # Helper function to read a storable upstream response into a cache
+    # entry. Responses without Content-Length or over the entry limit are
+    # left to stream through.
+    async def read_for_cache(response, streaming_response, rule_ttl):
+        ttl = response_cache.freshness(response.status_code, response.headers, rule_ttl)
+        length = response.headers.get("content-length")
+        if ttl is None or length is None or not length.isdigit() or int(length) > PROXY_CACHE_MAX_ENTRY_BYTES:
+            return None
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await streaming_response.background()
+        return CachedResponse(
+            response.status_code,
+            {
+                key: value for key, value in response_headers(response.headers).items()
+                if key.lower() not in PER_REQUEST_HEADERS
+            },
+            body,
+            ttl,
+            vary=response_cache.vary_names(response.headers)
+        )
+    
+    # Helper function to answer a GET from a cache entry, with a 304 when the
+    # client already has it
+    def cached_response(entry, request, cache_status):
+        headers = dict(entry.headers, age=str(int(entry.age())))
+        headers["x-cache"] = cache_status
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            response_cache.not_modified += 1
+            return Response(
+                status_code=304,
+                headers={key: value for key, value in headers.items() if key.lower() in NOT_MODIFIED_HEADERS}
             )
-            
+        return Response(content=entry.body, status_code=entry.status, headers=headers)
+    
+    # Helper function returning (content, follow_redirects) for a request body:
+    # small bodies with a Content-Length are read so a 307/308 redirect can
+    # resend them, anything else is streamed and redirects are relayed
+    async def request_content(request):
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) <= PROXY_REPLAY_BODY_BYTES:
+            return await request.body(), True
+        return request.stream(), False
+    
+    # Helper function to build the headers sent to the backend: everything
+    # except Host and hop-by-hop headers, plus the X-Forwarded-* set
+    def forward_headers(request):
+        headers = strip_hop_by_hop(request.headers)
+        headers.pop("host", None)
+        client = request.client
+        if client is not None:
+            previous = request.headers.get("x-forwarded-for")
+            headers["x-forwarded-for"] = f"{previous}, {client.host}" if previous else client.host
+        # WebSocket URLs use ws/wss; backends expect the HTTP scheme here
+        headers["x-forwarded-proto"] = {"ws": "http", "wss": "https"}.get(request.url.scheme, request.url.scheme)
+        headers["x-forwarded-host"] = request.headers.get("host", "")
+        # Same ID the client gets back, so backend logs can be correlated
+        request_id = request.scope.get("request_id")
+        if request_id is not None:
+            headers["x-request-id"] = request_id
+        return headers
+    
+    # Helper function to forward a request to the backend. Returns
+    # (entry, None) when cache_ttl is given and the response was read into a
+    # cache entry, otherwise (None, response).
+    async def forward(method, path, request, cache_ttl=None):
+        timing = request.scope["timing"]
+        content, follow_redirects = None, True
+        if method not in BODYLESS_METHODS:
+            # Read (when small) before taking a slot, so slow uploads do not hold one
+            content, follow_redirects = await request_content(request)
+        worker, error_response = await admit(method, path, timing)
+        if worker is None:
+            return None, error_response
+        url = f"{worker.base_url}/{path}"
+        if request.url.query:
+            url = f"{url}?{request.url.query}"
+        
         try:
-            logger.info(f"Forwarding GET request to {url}")
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, params=params, follow_redirects=True)
-                logger.info(f"Received response from container: {response.status_code}")
-                return StreamingResponse(
-                    content=response.aiter_bytes(),
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
+            logger.info(
+                "Forwarding %s request to %s", method, url,
+                extra={"event": "forwarding", "fields": {"request_id": timing.request_id}}
+            )
+            if method in BODYLESS_METHODS:
+                response, streaming_response = await stream_upstream(
+                    method, worker, url, get_timeout, timing, headers=forward_headers(request)
+                )
+            else:
+                response, streaming_response = await stream_upstream(
+                    method, worker, url, post_timeout, timing, headers=forward_headers(request),
+                    content=content, follow_redirects=follow_redirects
                 )
+            logger.info(
+                "Received response from container: %s", response.status_code,
+                extra={
+                    "event": "upstream_response",
+                    "fields": {"status": response.status_code, "request_id": timing.request_id}
+                }
+            )
+            if cache_ttl is not None:
+                entry = await read_for_cache(response, streaming_response, cache_ttl)
+                if entry is not None:
+                    return entry, None
+            return None, streaming_response
         except httpx.ConnectError as e:
-            logger.error(f"Connection error to container service: {e}")
-            return JSONResponse(
-                status_code=503,
-                content={"error": "Cannot connect to container service. It may be starting up or unavailable."}
+            upstream_errors.labels("connect").inc()
+            logger.error(
+                "Connection error to container service: %s", e,
+                extra={"event": "upstream_error", "fields": {"request_id": timing.request_id}}
             )
+            worker.monitor.report_failure()
+            return None, unavailable_response("Cannot connect to container service. It may be starting up or unavailable.")
         except httpx.ReadTimeout as e:
-            logger.error(f"Timeout connecting to container service: {e}")
-            return JSONResponse(
+            upstream_errors.labels("timeout").inc()
+            logger.error(
+                "Timeout connecting to container service: %s", e,
+                extra={"event": "upstream_timeout", "fields": {"request_id": timing.request_id}}
+            )
+            return None, JSONResponse(
                 status_code=504,
                 content={"error": "Connection to container service timed out"}
             )
         except Exception as e:
-            logger.error(f"Error forwarding GET request to {url}: {str(e)}")
-            return JSONResponse(
+            upstream_errors.labels("other").inc()
+            logger.error(
+                "Error forwarding %s request to %s: %s", method, url, e,
+                extra={"event": "upstream_error", "fields": {"request_id": timing.request_id}}
+            )
+            return None, JSONResponse(
                 status_code=500,
                 content={"error": f"Failed to process request: {str(e)}"}
             )
     
-    @fastapp.post("/{path:path}")
-    async def post_route(path: str, request: Request):
+    @fastapp.api_route("/{path:path}", methods=PROXY_METHODS)
+    async def proxy_route(path: str, request: Request):
+        method = request.method
         # Validate origin before processing request
         if not is_origin_allowed(request):
-            logger.warning(f"Access denied for POST /{path} from origin: {request.headers.get('origin', 'Unknown')}")
+            logger.warning(
+                "Access denied for %s /%s from origin: %s", method, path, request.headers.get("origin", "Unknown"),
+                extra={"event": "access_denied"}
+            )
             raise HTTPException(status_code=403, detail="Access denied: Origin not allowed")
-            
-        url = f"http://localhost:7860/{path}"
         
-        # Check if container service is available
-        if not is_port_open(7860):
-            logger.error(f"Container service not available on port 7860 for POST /{path}")
-            return JSONResponse(
-                status_code=503,
-                content={"error": "Container service is not available or still starting"}
+        cache_ttl = response_cache.ttl_for(f"/{path}") if method == "GET" else None
+        if cache_ttl is None or not response_cache.request_cacheable(request.headers):
+            _, response = await forward(method, path, request)
+            return response
+        
+        # Cached path: serve a fresh entry, or fetch once for concurrent misses
+        cache_key = response_cache.base_key(f"/{path}", request.query_params.multi_items())
+        with request.scope["timing"].phase("cache"):
+            entry = response_cache.get(cache_key, request.headers)
+        if entry is not None:
+            return cached_response(entry, request, "HIT")
+        entry, response = await response_cache.fetch(
+            cache_key, request.headers, lambda: forward(method, path, request, cache_ttl)
+        )
+        if entry is None:
+            return response
+        return cached_response(entry, request, "MISS")
+    
+    @fastapp.websocket("/{path:path}")
+    async def websocket_route(path: str, websocket: WebSocket):
+        # Same origin policy as HTTP; closing before accept rejects the handshake
+        if not is_origin_allowed(websocket):
+            logger.warning(
+                "Access denied for WebSocket /%s from origin: %s", path, websocket.headers.get("origin", "Unknown"),
+                extra={"event": "access_denied"}
             )
+            await websocket.close(code=1008)
+            return
+        if websocket_stats["active"] >= PROXY_MAX_WEBSOCKETS:
+            websocket_stats["rejected"] += 1
+            rejections.labels("websocket_limit").inc()
+            await websocket.close(code=1013)
+            return
+        
+        # WebSockets are long-lived, so they are counted against their own
+        # limit rather than holding an admission slot
+        worker = backend_pool.acquire()
+        if worker is None and await backend_pool.wait_ready(PROXY_READY_WAIT):
+            worker = backend_pool.acquire()
+        if worker is None:
+            websocket_stats["rejected"] += 1
+            rejections.labels("backend_unavailable").inc()
+            await websocket.close(code=1013)
+            return
         
+        url = f"ws://localhost:{worker.port}/{path}"
+        if websocket.url.query:
+            url = f"{url}?{websocket.url.query}"
+        headers = {
+            key: value for key, value in forward_headers(websocket).items()
+            if not key.startswith("sec-websocket-")
+        }
+        websocket_stats["active"] += 1
+        websocket_stats["opened"] += 1
         try:
-            body = await request.body()
-            headers = {key: value for key, value in request.headers.items() if key.lower() != "host"}
-            
-            logger.info(f"Forwarding POST request to {url}")
-            async with httpx.AsyncClient(timeout=60.0) as client:  # Increased timeout for POST requests
-                response = await client.post(
-                    url, 
-                    content=body, 
-                    headers=headers,
-                    follow_redirects=True
-                )
-                logger.info(f"Received response from container: {response.status_code}")
-                return StreamingResponse(
-                    content=response.aiter_bytes(),
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
+            try:
+                upstream = await websocket_connect(
+                    url,
+                    additional_headers=headers,
+                    subprotocols=websocket.scope.get("subprotocols") or None,
+                    user_agent_header=None,
+                    open_timeout=PROXY_CONNECT_TIMEOUT,
+                    max_size=PROXY_WS_MAX_MESSAGE,
+                    max_queue=PROXY_WS_MAX_QUEUE
                 )
-        except httpx.ConnectError as e:
-            logger.error(f"Connection error to container service: {e}")
-            return JSONResponse(
-                status_code=503,
-                content={"error": "Cannot connect to container service. It may be starting up or unavailable."}
-            )
-        except httpx.ReadTimeout as e:
-            logger.error(f"Timeout connecting to container service: {e}")
-            return JSONResponse(
-                status_code=504,
-                content={"error": "Connection to container service timed out"}
-            )
-        except Exception as e:
-            logger.error(f"Error forwarding POST request to {url}: {str(e)}")
-            return JSONResponse(
-                status_code=500,
-                content={"error": f"Failed to process request: {str(e)}"}
-            )
+            except (OSError, asyncio.TimeoutError, InvalidHandshake) as e:
+                upstream_errors.labels("websocket").inc()
+                logger.error("WebSocket connection to container service failed: %s", e, extra={"event": "upstream_error"})
+                if isinstance(e, OSError):
+                    worker.monitor.report_failure()
+                await websocket.close(code=1011)
+                return
+            
+            await websocket.accept(subprotocol=upstream.subprotocol)
+            await relay_websocket(websocket, upstream)
+        finally:
+            websocket_stats["active"] -= 1
+            backend_pool.release(worker)
+    
+    # Helper function to pump WebSocket messages both ways until either side
+    # closes. Each direction awaits its send before reading the next message,
+    # and the upstream connection's receive queue is bounded (max_queue), so
+    # a slow reader on either side pushes back on the sender over TCP instead
+    # of messages piling up in the proxy.
+    async def relay_websocket(websocket, upstream):
+        async def client_to_upstream():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes") is not None:
+                    await upstream.send(message["bytes"])
+                else:
+                    await upstream.send(message.get("text") or "")
+                websocket_stats["to_backend"] += 1
+        
+        async def upstream_to_client():
+            async for data in upstream:
+                if isinstance(data, bytes):
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_text(data)
+                websocket_stats["to_client"] += 1
+        
+        loop = asyncio.get_running_loop()
+        tasks = [loop.create_task(client_to_upstream()), loop.create_task(upstream_to_client())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        client_closed = tasks[0] in done
+        await upstream.close()
+        if not client_closed:
+            # The backend went away first; pass its close code on
+            try:
+                await websocket.close(code=upstream.close_code or 1000)
+            except RuntimeError:
+                pass
     
     @fastapp.options("/{path:path}")
     async def options_route(path: str, request: Request):
         # Validate origin for OPTIONS requests as well
         if not is_origin_allowed(request):
-            logger.warning(f"Access denied for OPTIONS /{path} from origin: {request.headers.get('origin', 'Unknown')}")
+            logger.warning(
+                "Access denied for OPTIONS /%s from origin: %s", path, request.headers.get("origin", "Unknown"),
+                extra={"event": "access_denied"}
+            )
             raise HTTPException(status_code=403, detail="Access denied: Origin not allowed")
         return {}
             
     return fastapp
 
+# Create a web app that serves the Docker container
+@app.function(
+    image=image,
+    **FUNCTION_OPTIONS
+)
+@input_concurrency
+@asgi_app()
+def web_app():
+    return create_web_app()
+
 @app.local_entrypoint()
 def main():
     print(f"Starting the {app_name} app on Modal")
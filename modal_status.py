@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import threading
+
+# Status lookup cache settings (override with environment variables)
+MODAL_STATUS_TTL = float(os.environ.get("MODAL_STATUS_TTL", "30"))
+MODAL_LIST_INTERVAL = float(os.environ.get("MODAL_LIST_INTERVAL", "60"))
+
+
+class _Flight:
+    # One in-progress lookup that concurrent callers wait on
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class ModalStatusCache:
+    """TTL cache with singleflight coalescing for `modal app show` lookups.
+
+    backend is a modal_backend.ModalBackend, so tests can substitute
+    FakeBackend. When list_interval is set, a background thread refreshes
+    every app from one `modal app list --json` call and individual lookups
+    become cache hits.
+    """
+
+    def __init__(self, backend, ttl=MODAL_STATUS_TTL, list_interval=MODAL_LIST_INTERVAL):
+        self.backend = backend
+        self.ttl = ttl
+        self.list_interval = list_interval
+        self.entries = {}
+        self.inflight = {}
+        self.listed_names = set()
+        self.listed_at = None
+        self.lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "backend_calls": 0,
+            "bulk_refreshes": 0,
+            "bulk_errors": 0
+        }
+        self.thread = None
+
+    def lookup(self, modal_name):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(modal_name)
+            if entry is not None and entry[0] > now:
+                self.counters["hits"] += 1
+                return entry[1]
+            if self._bulk_is_fresh(now) and modal_name not in self.listed_names:
+                # A recent full listing did not include this app
+                self.counters["hits"] += 1
+                return {"status": "unknown", "details": "App not found in modal app list"}
+            flight = self.inflight.get(modal_name)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[modal_name] = _Flight()
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        if not leader:
+            flight.event.wait()
+            return flight.result
+
+        result = None
+        try:
+            result = self._show(modal_name)
+            return result
+        finally:
+            with self.lock:
+                if result is not None and result["status"] != "error":
+                    self.entries[modal_name] = (time.monotonic() + self.ttl, result)
+                del self.inflight[modal_name]
+            flight.result = result or {"status": "error", "details": "Error checking status"}
+            flight.event.set()
+
+    def invalidate(self, modal_name):
+        with self.lock:
+            self.entries.pop(modal_name, None)
+            self.listed_names.discard(modal_name)
+
+    def refresh_all(self):
+        with self.lock:
+            self.counters["backend_calls"] += 1
+        returncode, stdout, stderr = self.backend.list()
+        if returncode != 0:
+            with self.lock:
+                self.counters["bulk_errors"] += 1
+            return False
+        try:
+            apps = json.loads(stdout)
+        except ValueError:
+            with self.lock:
+                self.counters["bulk_errors"] += 1
+            return False
+        now = time.monotonic()
+        entries = {}
+        for item in apps:
+            name = item.get("Description") or item.get("Name") or item.get("name")
+            state = str(item.get("State") or item.get("state") or "").lower()
+            if not name:
+                continue
+            if state.startswith("deployed"):
+                entries[name] = {"status": "deployed", "details": "App is deployed", "state": state}
+            elif entries.get(name, {}).get("status") != "deployed":
+                # Stopped rows of earlier deployments share the name; a deployed row wins
+                entries[name] = {"status": "unknown", "details": f"App state: {state or 'unknown'}", "state": state}
+        expires = now + max(self.ttl, self.list_interval)
+        with self.lock:
+            for name, result in entries.items():
+                self.entries[name] = (expires, result)
+            self.listed_names = set(entries)
+            self.listed_at = now
+            self.counters["bulk_refreshes"] += 1
+        return True
+
+    def start(self):
+        # Refresh all apps on a background interval (disabled when interval <= 0)
+        if self.list_interval <= 0 or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._refresh_loop, name="modal-status-refresh", daemon=True)
+        self.thread.start()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["cached_apps"] = len(self.entries)
+            stats["inflight"] = len(self.inflight)
+            stats["last_bulk_refresh_age"] = (
+                time.monotonic() - self.listed_at if self.listed_at is not None else None
+            )
+        return stats
+
+    def _show(self, modal_name):
+        with self.lock:
+            self.counters["backend_calls"] += 1
+        returncode, stdout, stderr = self.backend.show(modal_name)
+        if returncode == 0:
+            return {
+                "status": "deployed",
+                "details": "App is deployed",
+                "cli_output": stdout
+            }
+        return {
+            "status": "unknown",
+            "details": "App not found or error checking status",
+            "cli_output": stderr
+        }
+
+    def _bulk_is_fresh(self, now):
+        return self.listed_at is not None and now - self.listed_at < self.list_interval * 2
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh_all()
+            except Exception:
+                with self.lock:
+                    self.counters["bulk_errors"] += 1
+            time.sleep(self.list_interval)
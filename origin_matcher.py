@@ -0,0 +1,69 @@
+import re
+from functools import lru_cache
+
+# Number of distinct Origin/Referer header values whose decision is cached
+ORIGIN_CACHE_SIZE = 4096
+
+
+def extract_domain(url, strip_www=False):
+    """Extract the lower-cased domain from a URL without protocol, path, credentials or port."""
+    if not url:
+        return ""
+    if "://" in url:
+        url = url.split("://", 1)[1]
+    host = url.split("/", 1)[0].split("?", 1)[0].rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    if strip_www and host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+class OriginMatcher:
+    """Decides whether an Origin/Referer header belongs to an allowed domain.
+
+    Allowed domains are stored in a trie keyed by reversed labels
+    ("app.web.galaxykicklock"), so exact and subdomain matches cost one
+    dict step per label instead of a scan over every allowed domain.
+    Decisions are cached per raw header value in a bounded LRU, so a
+    repeat origin resolves with a single lookup.
+    """
+
+    # Marks a trie node where an allowed domain ends
+    TERMINAL = object()
+
+    def __init__(self, allowed_domains, allow_subdomains=False, strip_www=False, cache_size=ORIGIN_CACHE_SIZE):
+        self.allowed_domains = sorted({domain.lower() for domain in allowed_domains})
+        self.allow_subdomains = allow_subdomains
+        self.strip_www = strip_www
+        self.trie = {}
+        for domain in self.allowed_domains:
+            node = self.trie
+            for label in reversed(domain.split(".")):
+                node = node.setdefault(label, {})
+            node[self.TERMINAL] = True
+        self.allows = lru_cache(maxsize=cache_size)(self._allows)
+
+    def matches_domain(self, domain):
+        if not domain:
+            return False
+        node = self.trie
+        labels = domain.split(".")
+        for position in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[position])
+            if node is None:
+                return False
+            if self.TERMINAL in node and (position == 0 or self.allow_subdomains):
+                return True
+        return False
+
+    def _allows(self, header_value):
+        return self.matches_domain(extract_domain(header_value, self.strip_www))
+
+    def origin_regex(self):
+        """Regex matching allowed http(s) origins, for CORS middleware configuration."""
+        domains = "|".join(re.escape(domain) for domain in self.allowed_domains)
+        subdomains = r"(?:[a-z0-9-]+\.)*" if self.allow_subdomains else ""
+        www = r"(?:www\.)?" if self.strip_www and not self.allow_subdomains else ""
+        return rf"https?://{www}{subdomains}(?:{domains})(?::\d+)?"
+
+    def cache_info(self):
+        return self.allows.cache_info()
@@ -0,0 +1,140 @@
+import os
+import json
+
+# Environment variable carrying the resolved profile (as JSON) from app.py
+# into `modal deploy modal_container.py`
+PROFILE_ENV = "MODAL_PERFORMANCE_PROFILE"
+
+DEFAULT_PROFILE = "standard"
+
+# Named resource profiles for the web_app function. None leaves Modal's default.
+# - cpu, memory: per container (cores, MiB)
+# - min_containers, max_containers: container bounds; min_containers > 0 keeps them warm
+# - scaledown_window: seconds an idle container above the minimum stays up
+# - max_inputs, target_inputs: concurrent requests per container (hard cap, autoscaling target)
+# More than one container splits clients across separate galaxybackend processes.
+PROFILES = {
+    # The original fixed configuration: a single always-on container
+    "standard": {
+        "cpu": 1.5, "memory": 2048, "min_containers": 1, "max_containers": 1,
+        "scaledown_window": None, "max_inputs": None, "target_inputs": None
+    },
+    # Scales to zero when idle; the first request afterwards waits for a cold start
+    "economy": {
+        "cpu": 0.5, "memory": 1024, "min_containers": 0, "max_containers": 1,
+        "scaledown_window": 300, "max_inputs": 64, "target_inputs": None
+    },
+    # Peak load: bigger containers that autoscale out around 100 requests each
+    "peak": {
+        "cpu": 2.0, "memory": 4096, "min_containers": 1, "max_containers": 4,
+        "scaledown_window": 600, "max_inputs": 200, "target_inputs": 100
+    }
+}
+
+# (minimum, maximum) accepted for each setting
+LIMITS = {
+    "cpu": (0.125, 64),
+    "memory": (128, 344064),
+    "min_containers": (0, 100),
+    "max_containers": (1, 100),
+    "scaledown_window": (2, 1200),
+    "max_inputs": (1, 1000),
+    "target_inputs": (1, 1000)
+}
+INTEGER_SETTINGS = ("memory", "min_containers", "max_containers", "scaledown_window", "max_inputs", "target_inputs")
+
+
+def load_profiles(extra=None):
+    """Built-in profiles plus any defined as JSON in PERFORMANCE_PROFILES,
+    e.g. {"big": {"cpu": 4, "memory": 8192}}. Missing settings default to
+    the standard profile's; every profile is validated."""
+    if extra is None:
+        extra = os.environ.get("PERFORMANCE_PROFILES", "")
+    profiles = dict(PROFILES)
+    if extra:
+        for name, settings in json.loads(extra).items():
+            profiles[name] = dict(PROFILES[DEFAULT_PROFILE], **settings)
+    return {name: validate_profile(settings, name) for name, settings in profiles.items()}
+
+
+def validate_profile(settings, name="profile"):
+    """Return a normalized copy of a profile's settings, or raise ValueError listing every problem."""
+    errors = []
+    unknown = sorted(set(settings) - set(LIMITS) - {"name"})
+    if unknown:
+        errors.append(f"unknown settings: {', '.join(unknown)}")
+    profile = {}
+    for key, (low, high) in LIMITS.items():
+        value = settings.get(key)
+        if value is None:
+            if key in ("cpu", "memory", "min_containers", "max_containers"):
+                errors.append(f"{key} is required")
+            profile[key] = None
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{key} must be a number")
+            continue
+        if key in INTEGER_SETTINGS:
+            if value != int(value):
+                errors.append(f"{key} must be a whole number")
+                continue
+            value = int(value)
+        if not low <= value <= high:
+            errors.append(f"{key} must be between {low} and {high}")
+            continue
+        profile[key] = value
+    if not errors:
+        if profile["max_containers"] < profile["min_containers"]:
+            errors.append("max_containers must be at least min_containers")
+        if profile["target_inputs"] is not None:
+            if profile["max_inputs"] is None:
+                errors.append("target_inputs needs max_inputs")
+            elif profile["target_inputs"] > profile["max_inputs"]:
+                errors.append("target_inputs must not exceed max_inputs")
+    if errors:
+        raise ValueError(f"Invalid performance profile {name!r}: " + "; ".join(errors))
+    profile["name"] = settings.get("name", name)
+    return profile
+
+
+def resolve_profile(name, profiles=None):
+    """Validated settings of a named profile; raises ValueError for unknown names."""
+    profiles = load_profiles() if profiles is None else profiles
+    if name not in profiles:
+        raise ValueError(f"Unknown performance profile {name!r} (available: {', '.join(sorted(profiles))})")
+    return dict(profiles[name], name=name)
+
+
+def profile_env(profile):
+    return {PROFILE_ENV: json.dumps(profile, sort_keys=True)}
+
+
+def profile_from_env(environ=None):
+    """Profile passed by app.py: a JSON object or a profile name, defaulting to the standard profile."""
+    value = (os.environ if environ is None else environ).get(PROFILE_ENV, "").strip()
+    if not value:
+        return resolve_profile(DEFAULT_PROFILE, PROFILES)
+    if value.startswith("{"):
+        settings = json.loads(value)
+        return validate_profile(settings, settings.get("name", "custom"))
+    return resolve_profile(value)
+
+
+def function_options(profile):
+    """Render a profile as Modal configuration, without importing modal.
+
+    Returns (function_kwargs, concurrent_kwargs): keyword arguments for
+    @app.function and, when the profile sets input concurrency, for
+    @modal.concurrent (otherwise None).
+    """
+    profile = validate_profile(profile, profile.get("name", "profile"))
+    function_kwargs = {
+        key: profile[key] for key in ("cpu", "memory", "min_containers", "max_containers", "scaledown_window")
+        if profile[key] is not None
+    }
+    concurrent_kwargs = None
+    if profile["max_inputs"] is not None:
+        concurrent_kwargs = {"max_inputs": profile["max_inputs"]}
+        if profile["target_inputs"] is not None:
+            concurrent_kwargs["target_inputs"] = profile["target_inputs"]
+    return function_kwargs, concurrent_kwargs
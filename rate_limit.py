@@ -0,0 +1,155 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from sqlite_connections import thread_connection
+
+# Rate limit settings (override with environment variables)
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_DB = os.environ.get("RATE_LIMIT_DB", "")
+# Longest wait (seconds) for a SQLite write lock before the request is let through
+RATE_LIMIT_DB_TIMEOUT = float(os.environ.get("RATE_LIMIT_DB_TIMEOUT", "0.005"))
+# Per-route limits as JSON, e.g. {"/api/deploy": [5, 60]} (path prefix -> [requests, seconds])
+RATE_LIMIT_ROUTES = json.loads(os.environ.get("RATE_LIMIT_ROUTES", "{}"))
+
+
+def _sliding_window(state, limit, window, now):
+    # Sliding window counter: the previous window's count is weighted by how
+    # much of it still overlaps the trailing window. state is
+    # (window_index, current_count, previous_count); returns
+    # (new_state, allowed, retry_after).
+    index = int(now // window)
+    if state is None or state[0] < index - 1:
+        current, previous = 0, 0
+    elif state[0] == index - 1:
+        current, previous = 0, state[1]
+    else:
+        current, previous = state[1], state[2]
+    elapsed = (now % window) / window
+    if previous * (1 - elapsed) + current >= limit:
+        return (index, current, previous), False, max(1, math.ceil(window - now % window))
+    return (index, current + 1, previous), True, 0
+
+
+class MemoryRateLimitStore:
+    """Per-process counters, bounded to max_clients keys in LRU order."""
+
+    def __init__(self, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.counters = OrderedDict()
+        self.lock = threading.Lock()
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.counters.get(key)
+            state, allowed, retry_after = _sliding_window(entry and entry[0], limit, window, now)
+            # After two full windows without requests the counters are back to zero
+            self.counters[key] = (state, (state[0] + 2) * window)
+            self.counters.move_to_end(key)
+            self._evict(now)
+        return allowed, retry_after
+
+    def __len__(self):
+        return len(self.counters)
+
+    def _evict(self, now):
+        # Drop idle keys from the least recently seen end, and enforce the bound
+        while self.counters:
+            key, (_, expires_at) = next(iter(self.counters.items()))
+            if expires_at > now and len(self.counters) <= self.max_clients:
+                break
+            del self.counters[key]
+
+
+class SqliteRateLimitStore:
+    """Counters in a shared SQLite file so limits hold across uvicorn workers.
+
+    hit() is called from the ASGI policy layer and so runs on the event
+    loop. It waits at most busy_timeout seconds for the write lock; if
+    another worker holds it longer, the request is allowed (fail open)
+    rather than stalling every other request in this process.
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path, busy_timeout=RATE_LIMIT_DB_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+        self.last_prune = 0.0
+        self.fail_open_count = 0
+        # Created at startup with the default (longer) timeout, as workers start together
+        connection = thread_connection(threading.local(), path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, "
+            "current INTEGER NOT NULL, previous INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.close()
+
+    def _connection(self):
+        return thread_connection(self.local, self.path, timeout=self.busy_timeout, synchronous="OFF")
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        try:
+            # Opening a connection takes the lock too (PRAGMA journal_mode)
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                row = connection.execute(
+                    "SELECT window_index, current, previous FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                state, allowed, retry_after = _sliding_window(row, limit, window, now)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, window_index, current, previous, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, *state, (state[0] + 2) * window)
+                )
+        except sqlite3.OperationalError:
+            # Database locked by another worker for longer than busy_timeout
+            self.fail_open_count += 1
+            return True, 0
+        if now - self.last_prune >= self.PRUNE_INTERVAL:
+            self.last_prune = now
+            try:
+                with connection:
+                    connection.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+            except sqlite3.OperationalError:
+                pass  # Retried on the next interval
+        return allowed, retry_after
+
+
+class RateLimiter:
+    """Applies a default limit plus per-route overrides matched by path prefix."""
+
+    def __init__(self, requests_limit=30, time_window=60, route_limits=None, store=None):
+        self.default = (requests_limit, time_window)
+        # Longest prefix first so the most specific rule wins
+        self.routes = sorted(
+            ((prefix, tuple(rule)) for prefix, rule in (route_limits or {}).items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self.store = store if store is not None else MemoryRateLimitStore()
+
+    def check(self, client, path):
+        """Count a request; returns (allowed, retry_after_seconds)."""
+        prefix = ""
+        limit, window = self.default
+        for route_prefix, rule in self.routes:
+            if path.startswith(route_prefix):
+                prefix = route_prefix
+                limit, window = rule
+                break
+        return self.store.hit(f"{client}|{prefix}", limit, window)
+
+
+def create_rate_limit_store(path=RATE_LIMIT_DB):
+    if path:
+        return SqliteRateLimitStore(path)
+    return MemoryRateLimitStore()
@@ -0,0 +1,156 @@
+import json
+import time
+
+from origin_matcher import OriginMatcher
+
+# User agents of common API clients that are refused
+DEFAULT_BLOCKED_AGENTS = ("curl", "wget", "postman", "insomnia", "python-requests", "httpie")
+
+# Headers added to every response
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "Content-Security-Policy": "default-src 'self'; connect-src *; script-src 'self' 'unsafe-inline' 'unsafe-eval'; style-src 'self' 'unsafe-inline'",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Referrer-Policy": "same-origin"
+}
+
+# CORS headers added when the Origin belongs to an allowed domain
+CORS_HEADERS = {
+    "Access-Control-Allow-Credentials": "true",
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization"
+}
+
+
+def _encode(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+
+def _json_body(content):
+    return json.dumps(content).encode()
+
+
+class RequestPolicyMiddleware:
+    """Pure ASGI request policy: domain restriction, anti-automation, rate
+    limiting, security headers and CORS in a single pass.
+
+    Rules are compiled once at start-up. Requests are checked from the raw
+    ASGI headers and headers are added to the response start message, so
+    the response body is never wrapped or re-buffered.
+    """
+
+    def __init__(self, app, allowed_domains, rate_limiter=None, blocked_agents=DEFAULT_BLOCKED_AGENTS,
+                 security_headers=SECURITY_HEADERS, log=print, rejections=None, exempt_paths=()):
+        self.app = app
+        self.origins = OriginMatcher(allowed_domains)
+        self.rate_limiter = rate_limiter
+        self.blocked_agents = tuple(agent.lower() for agent in blocked_agents)
+        self.log = log
+        # Optional counter labelled (check, status), incremented on every rejection
+        self.rejections = rejections
+        # Paths that bypass the checks (e.g. a token-protected /metrics scraped server-side)
+        self.exempt_paths = frozenset(exempt_paths)
+        self.security_headers = _encode(security_headers)
+        self.cors_headers = _encode(CORS_HEADERS)
+        self.security_names = frozenset(name for name, _ in self.security_headers)
+        self.cors_names = self.security_names | {name for name, _ in self.cors_headers} | {b"access-control-allow-origin"}
+        self.domain_denied = _json_body({
+            "error": "Access denied",
+            "message": "This service can only be accessed from authorized domains."
+        })
+        self.agent_denied = _json_body({"error": "Access denied", "message": "API client tools not allowed"})
+        self.headers_denied = _json_body({"error": "Access denied", "message": "Missing required headers"})
+        self.rate_limited = _json_body({"error": "Too many requests", "message": "Rate limit exceeded. Try again later."})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        # Phase timings, when ServerTimingMiddleware wraps this layer
+        timing = scope.get("timing")
+        started = time.perf_counter()
+
+        # Read the headers we need in one pass over the raw list
+        origin = referer = user_agent = b""
+        has_accept = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"referer":
+                referer = value
+            elif name == b"user-agent":
+                user_agent = value
+            elif name == b"accept" or name == b"accept-language":
+                has_accept = has_accept or bool(value)
+        origin = origin.decode("latin-1")
+        origin_allowed = self.origins.allows(origin)
+
+        extra_headers = self.security_headers
+        override_names = self.security_names
+        if origin_allowed:
+            extra_headers = extra_headers + [(b"access-control-allow-origin", origin.encode("latin-1"))] + self.cors_headers
+            override_names = self.cors_names
+
+        # Domain restriction: Origin or Referer must belong to an allowed domain
+        if not origin_allowed and not self.origins.allows(referer.decode("latin-1")):
+            client = scope.get("client")
+            self.log(f"Access denied: Origin: {origin}, Referer: {referer.decode('latin-1')}, IP: {client[0] if client else 'unknown'}")
+            await self._reject(send, "domain", 403, self.domain_denied, extra_headers, timing, started)
+            return
+
+        # Anti-automation checks (skipped for CORS preflight)
+        if scope["method"] != "OPTIONS":
+            agent = user_agent.decode("latin-1").lower()
+            if any(blocked in agent for blocked in self.blocked_agents):
+                await self._reject(send, "user_agent", 403, self.agent_denied, extra_headers, timing, started)
+                return
+            if not has_accept:
+                await self._reject(send, "headers", 403, self.headers_denied, extra_headers, timing, started)
+                return
+
+        # Rate limiting
+        if self.rate_limiter is not None:
+            client = scope.get("client")
+            allowed, retry_after = self.rate_limiter.check(client[0] if client else "unknown", scope["path"])
+            if not allowed:
+                await self._reject(
+                    send, "rate_limit", 429, self.rate_limited,
+                    extra_headers + [(b"retry-after", str(retry_after).encode("latin-1"))], timing, started
+                )
+                return
+
+        handed_off = time.perf_counter()
+        if timing is not None:
+            timing.add("policy", handed_off - started)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                if timing is not None:
+                    # Routing and the endpoint, up to the response headers
+                    timing.add("app", time.perf_counter() - handed_off)
+                headers = [
+                    (name, value) for name, value in message.get("headers", ())
+                    if name.lower() not in override_names
+                ]
+                headers.extend(extra_headers)
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _reject(self, send, check, status, body, extra_headers, timing=None, started=None):
+        if timing is not None:
+            timing.add("policy", time.perf_counter() - started, f"rejected: {check}")
+        if self.rejections is not None:
+            self.rejections.labels(check, str(status)).inc()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1"))
+            ] + extra_headers
+        })
+        await send({"type": "http.response.body", "body": body})
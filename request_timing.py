@@ -0,0 +1,139 @@
+import re
+import time
+import uuid
+
+# Client-supplied request IDs are accepted when they look like an ID (not arbitrary header text)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:\-]{1,128}$")
+# W3C trace context: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+
+def request_id_from(headers):
+    """Request ID for raw ASGI headers: the client's X-Request-ID, else the
+    trace ID of a W3C traceparent, else a new one."""
+    traceparent = None
+    for name, value in headers:
+        if name == b"x-request-id":
+            value = value.decode("latin-1").strip()
+            if _REQUEST_ID.match(value):
+                return value
+        elif name == b"traceparent":
+            traceparent = value.decode("latin-1").strip().lower()
+    if traceparent:
+        match = _TRACEPARENT.match(traceparent)
+        if match and match.group(1) != "0" * 32:
+            return match.group(1)
+    return uuid.uuid4().hex
+
+
+class RequestTiming:
+    """Named phase durations for one request, rendered as Server-Timing."""
+
+    __slots__ = ("request_id", "started", "phases")
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.phases = []
+
+    def add(self, name, seconds, description=None):
+        self.phases.append((name, seconds, description))
+
+    def phase(self, name, description=None):
+        """Context manager timing a block as one phase."""
+        return _Phase(self, name, description)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header(self, total):
+        parts = []
+        for name, seconds, description in self.phases:
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if description:
+                part += f';desc="{description}"'
+            parts.append(part)
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+    def durations(self):
+        """{phase_ms: milliseconds}, summing phases recorded more than once."""
+        durations = {}
+        for name, seconds, _ in self.phases:
+            key = f"{name}_ms"
+            durations[key] = round(durations.get(key, 0.0) + seconds * 1000, 3)
+        return durations
+
+
+class _Phase:
+    __slots__ = ("timing", "name", "description", "start")
+
+    def __init__(self, timing, name, description):
+        self.timing = timing
+        self.name = name
+        self.description = description
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timing.add(self.name, time.perf_counter() - self.start, self.description)
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware giving every request an ID and a phase timer.
+
+    The ID (see request_id_from) is stored in scope["request_id"] for HTTP
+    and WebSocket requests and returned as X-Request-ID. Inner layers record
+    phases on scope["timing"]; they are sent in a Server-Timing header with
+    the response start, next to any Server-Timing the app already set. Body
+    streaming happens after the headers are sent, so it only appears in the
+    record passed to on_complete(record) once the response is finished.
+    """
+
+    def __init__(self, app, on_complete=None):
+        self.app = app
+        self.on_complete = on_complete
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            scope["request_id"] = request_id_from(scope["headers"])
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = scope["request_id"] = request_id_from(scope["headers"])
+        timing = scope["timing"] = RequestTiming(request_id)
+        status = 500
+        headers_sent = None
+
+        async def send_with_timing(message):
+            nonlocal status, headers_sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers_sent = timing.elapsed()
+                # A backend echoing the ID would otherwise send it twice
+                headers = [(name, value) for name, value in message.get("headers", ()) if name.lower() != b"x-request-id"]
+                headers.append((b"server-timing", timing.header(headers_sent).encode("latin-1")))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if self.on_complete is not None:
+                total = timing.elapsed()
+                record = {
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "total_ms": round(total * 1000, 3)
+                }
+                record.update(timing.durations())
+                if headers_sent is not None:
+                    record["headers_ms"] = round(headers_sent * 1000, 3)
+                    record["stream_ms"] = round((total - headers_sent) * 1000, 3)
+                self.on_complete(record)
@@ -0,0 +1,202 @@
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+# Default bounds for the proxy response cache
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_ENTRY_BYTES = 1024 * 1024
+
+# Headers kept on a 304 Not Modified response
+NOT_MODIFIED_HEADERS = {"cache-control", "content-location", "date", "etag", "expires", "vary", "age", "x-cache"}
+
+
+def parse_cache_control(value):
+    """Parse a Cache-Control header into {directive: argument or None}."""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+class CachedResponse:
+    def __init__(self, status, headers, body, ttl, vary=()):
+        self.status = status
+        self.headers = dict(headers)
+        self.body = body
+        # Request headers named by Vary, lower-cased
+        self.vary = vary
+        self.etag = self.headers.get("etag")
+        if self.etag is None:
+            # Give every entry a validator so If-None-Match can be answered
+            self.etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()[:20]
+            self.headers["etag"] = self.etag
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+        self.size = len(body) + sum(len(name) + len(value) for name, value in self.headers.items())
+
+    def age(self, now=None):
+        return (time.monotonic() if now is None else now) - self.stored_at
+
+
+class ResponseCache:
+    """In-memory cache for proxied GET responses.
+
+    Only paths with an opt-in rule are cached; a rule maps a path prefix to
+    the longest time (seconds) a response may be kept, which upstream
+    Cache-Control max-age/s-maxage can shorten but not extend. Responses
+    marked no-store, no-cache or private, with Set-Cookie, or with Vary: *,
+    and requests with Authorization or Cookie, are never cached; entries
+    are keyed on the request headers named by Vary. The cache is an LRU
+    bounded by total bytes. Concurrent misses for the same path and query
+    share one upstream fetch.
+    """
+
+    def __init__(self, rules=None, max_bytes=CACHE_MAX_BYTES, max_entry_bytes=CACHE_MAX_ENTRY_BYTES):
+        # Longest prefix first so the most specific rule wins
+        self.rules = sorted((rules or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        # (path, query) -> Vary header names last seen for it
+        self.vary = {}
+        # (path, query) -> future resolved when the leading fetch for it finishes
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def ttl_for(self, path):
+        for prefix, ttl in self.rules:
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    def request_cacheable(self, request_headers):
+        # Requests carrying credentials may get per-user responses
+        return "authorization" not in request_headers and "cookie" not in request_headers
+
+    def base_key(self, path, params):
+        return path, tuple(sorted(params))
+
+    def _key(self, base, request_headers, vary):
+        return base + tuple(request_headers.get(name, "") for name in vary)
+
+    def get(self, base, request_headers):
+        """Fresh entry for the request, or None."""
+        entry = self._fresh(base, request_headers)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def _fresh(self, base, request_headers):
+        directives = parse_cache_control(request_headers.get("cache-control"))
+        if "no-cache" in directives or "no-store" in directives or directives.get("max-age") == "0":
+            return None
+        key = self._key(base, request_headers, self.vary.get(base, ()))
+        entry = self.entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def freshness(self, status, headers, rule_ttl):
+        """Seconds a response may be stored for, or None if it must not be."""
+        if status != 200 or "set-cookie" in headers:
+            return None
+        directives = parse_cache_control(headers.get("cache-control"))
+        if "no-store" in directives or "no-cache" in directives or "private" in directives:
+            return None
+        if headers.get("vary", "").strip() == "*":
+            return None
+        max_age = directives.get("s-maxage", directives.get("max-age"))
+        ttl = rule_ttl
+        if max_age is not None:
+            try:
+                ttl = min(rule_ttl, int(max_age))
+            except ValueError:
+                return None
+        return ttl if ttl > 0 else None
+
+    def vary_names(self, headers):
+        return tuple(sorted(
+            name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()
+        ))
+
+    def put(self, base, request_headers, entry):
+        if entry.size > self.max_entry_bytes:
+            return
+        self.vary[base] = entry.vary
+        key = self._key(base, request_headers, entry.vary)
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= previous.size
+        self.entries[key] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    async def fetch(self, base, request_headers, fetch):
+        """Run fetch() for a miss, coalescing concurrent misses on `base`.
+
+        fetch() returns (entry, response): a storable CachedResponse, or
+        None and the response to send instead. The first caller runs it and
+        stores the entry; callers arriving meanwhile wait and reuse that
+        entry, or run their own fetch if nothing was stored.
+        """
+        flight = self.inflight.get(base)
+        if flight is not None:
+            self.coalesced += 1
+            await asyncio.shield(flight)
+            entry = self._fresh(base, request_headers)
+            if entry is not None:
+                return entry, None
+            return await fetch()
+
+        flight = asyncio.get_running_loop().create_future()
+        self.inflight[base] = flight
+        try:
+            entry, response = await fetch()
+            if entry is not None:
+                self.put(base, request_headers, entry)
+            return entry, response
+        finally:
+            del self.inflight[base]
+            flight.set_result(None)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,18 @@
+import sqlite3
+
+
+def thread_connection(local, path, timeout=5.0, synchronous="NORMAL"):
+    """Autocommit WAL connection to path for the calling thread, kept on local
+    (a threading.local()): sqlite3 connections cannot be shared between threads."""
+    connection = getattr(local, "connection", None)
+    if connection is None:
+        connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={synchronous}")
+        except sqlite3.Error:
+            # e.g. locked; the next call opens a fresh connection
+            connection.close()
+            raise
+        local.connection = connection
+    return connection
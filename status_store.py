@@ -0,0 +1,240 @@
+import os
+import abc
+import json
+import time
+import threading
+from collections import OrderedDict
+from sqlite_connections import thread_connection
+
+# Status store settings (override with environment variables)
+STATUS_STORE = os.environ.get("STATUS_STORE", "sqlite")
+STATUS_DB_PATH = os.environ.get("STATUS_DB_PATH", "deployment_status.db")
+STATUS_HISTORY_TTL = float(os.environ.get("STATUS_HISTORY_TTL", str(30 * 24 * 3600)))
+STATUS_PRUNE_INTERVAL = float(os.environ.get("STATUS_PRUNE_INTERVAL", "300"))
+STATUS_CACHE_TTL = float(os.environ.get("STATUS_CACHE_TTL", "1"))
+STATUS_CACHE_SIZE = int(os.environ.get("STATUS_CACHE_SIZE", "1024"))
+
+
+class StatusStore(abc.ABC):
+    """Current status per app plus a history of status transitions.
+
+    Stores behave like a dict of modal_name -> status record, so existing
+    ``deployment_status[name] = {...}`` call sites keep working.
+    """
+
+    @abc.abstractmethod
+    def get(self, modal_name, default=None):
+        pass
+
+    @abc.abstractmethod
+    def set(self, modal_name, record):
+        pass
+
+    @abc.abstractmethod
+    def history(self, modal_name, limit=50):
+        pass
+
+    @abc.abstractmethod
+    def list(self, status=None, limit=100):
+        pass
+
+    @abc.abstractmethod
+    def prune(self, older_than=None):
+        pass
+
+    def __getitem__(self, modal_name):
+        record = self.get(modal_name)
+        if record is None:
+            raise KeyError(modal_name)
+        return record
+
+    def __setitem__(self, modal_name, record):
+        self.set(modal_name, record)
+
+    def __contains__(self, modal_name):
+        return self.get(modal_name) is not None
+
+
+class MemoryStatusStore(StatusStore):
+    """Process-local store, mainly for development and tests."""
+
+    def __init__(self, history_ttl=STATUS_HISTORY_TTL):
+        self.history_ttl = history_ttl
+        self.current = {}
+        self.transitions = []
+        self.lock = threading.Lock()
+
+    def get(self, modal_name, default=None):
+        with self.lock:
+            entry = self.current.get(modal_name)
+        return entry[1] if entry else default
+
+    def set(self, modal_name, record):
+        now = time.time()
+        with self.lock:
+            self.current[modal_name] = (now, record)
+            self.transitions.append((now, modal_name, record))
+
+    def history(self, modal_name, limit=50):
+        with self.lock:
+            entries = [(at, record) for at, name, record in self.transitions if name == modal_name]
+        return [dict(record, recorded_at=at) for at, record in reversed(entries[-limit:])]
+
+    def list(self, status=None, limit=100):
+        with self.lock:
+            items = sorted(self.current.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            dict(record, modal_name=name, updated_at=at)
+            for name, (at, record) in items
+            if status is None or record.get("status") == status
+        ][:limit]
+
+    def prune(self, older_than=None):
+        cutoff = time.time() - (self.history_ttl if older_than is None else older_than)
+        with self.lock:
+            before = len(self.transitions)
+            self.transitions = [entry for entry in self.transitions if entry[0] >= cutoff]
+            return before - len(self.transitions)
+
+
+class SqliteStatusStore(StatusStore):
+    """SQLite store in WAL mode, shareable between uvicorn worker processes."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS app_status (
+            modal_name TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            record TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_app_status_status ON app_status (status, updated_at);
+        CREATE INDEX IF NOT EXISTS idx_app_status_updated ON app_status (updated_at);
+        CREATE TABLE IF NOT EXISTS status_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            modal_name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            recorded_at REAL NOT NULL,
+            record TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_app ON status_history (modal_name, recorded_at);
+        CREATE INDEX IF NOT EXISTS idx_history_recorded ON status_history (recorded_at);
+    """
+
+    def __init__(self, path=STATUS_DB_PATH, history_ttl=STATUS_HISTORY_TTL, prune_interval=STATUS_PRUNE_INTERVAL):
+        self.path = path
+        self.history_ttl = history_ttl
+        self.prune_interval = prune_interval
+        self.last_prune = 0.0
+        self.local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        return thread_connection(self.local, self.path)
+
+    def get(self, modal_name, default=None):
+        row = self._connection().execute(
+            "SELECT record FROM app_status WHERE modal_name = ?", (modal_name,)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, modal_name, record):
+        now = time.time()
+        status = record.get("status", "unknown")
+        payload = json.dumps(record)
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT INTO app_status (modal_name, status, updated_at, record) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (modal_name) DO UPDATE SET "
+                "status = excluded.status, updated_at = excluded.updated_at, record = excluded.record",
+                (modal_name, status, now, payload)
+            )
+            connection.execute(
+                "INSERT INTO status_history (modal_name, status, recorded_at, record) VALUES (?, ?, ?, ?)",
+                (modal_name, status, now, payload)
+            )
+        if now - self.last_prune >= self.prune_interval:
+            self.prune()
+
+    def history(self, modal_name, limit=50):
+        rows = self._connection().execute(
+            "SELECT recorded_at, record FROM status_history WHERE modal_name = ? "
+            "ORDER BY recorded_at DESC LIMIT ?",
+            (modal_name, limit)
+        ).fetchall()
+        return [dict(json.loads(record), recorded_at=recorded_at) for recorded_at, record in rows]
+
+    def list(self, status=None, limit=100):
+        if status is None:
+            rows = self._connection().execute(
+                "SELECT modal_name, updated_at, record FROM app_status ORDER BY updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT modal_name, updated_at, record FROM app_status WHERE status = ? "
+                "ORDER BY updated_at DESC LIMIT ?",
+                (status, limit)
+            ).fetchall()
+        return [dict(json.loads(record), modal_name=name, updated_at=at) for name, at, record in rows]
+
+    def prune(self, older_than=None):
+        self.last_prune = time.time()
+        cutoff = self.last_prune - (self.history_ttl if older_than is None else older_than)
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("DELETE FROM status_history WHERE recorded_at < ?", (cutoff,))
+        return cursor.rowcount
+
+
+class CachedStatusStore(StatusStore):
+    """Read-through TTL cache in front of another store.
+
+    Writes from this process invalidate the cache immediately; writes from
+    other workers become visible once the TTL expires.
+    """
+
+    def __init__(self, store, ttl=STATUS_CACHE_TTL, max_entries=STATUS_CACHE_SIZE):
+        self.store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, modal_name, default=None):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.cache.get(modal_name)
+            if entry is not None and entry[0] > now:
+                self.cache.move_to_end(modal_name)
+                return default if entry[1] is None else entry[1]
+        record = self.store.get(modal_name)
+        with self.lock:
+            self.cache[modal_name] = (now + self.ttl, record)
+            self.cache.move_to_end(modal_name)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return default if record is None else record
+
+    def set(self, modal_name, record):
+        self.store.set(modal_name, record)
+        with self.lock:
+            self.cache.pop(modal_name, None)
+
+    def history(self, modal_name, limit=50):
+        return self.store.history(modal_name, limit)
+
+    def list(self, status=None, limit=100):
+        return self.store.list(status, limit)
+
+    def prune(self, older_than=None):
+        return self.store.prune(older_than)
+
+
+def create_status_store(kind=STATUS_STORE):
+    if kind == "memory":
+        return MemoryStatusStore()
+    if kind == "sqlite":
+        return CachedStatusStore(SqliteStatusStore())
+    raise ValueError(f"Unknown status store: {kind}")
@@ -0,0 +1,137 @@
+import sys
+import json
+import queue
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Records buffered between the logging call and the writer thread
+LOG_QUEUE_SIZE = 10000
+# Records per second kept for each sampled event (the rest are counted, not written)
+LOG_EVENT_RATE = 20
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event, message and any
+    structured fields passed as extra={"event": ..., "fields": {...}}."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class EventRateFilter(logging.Filter):
+    """Caps each named high-volume event at `rate` records per second.
+
+    Records over the cap are dropped before they are queued; the number
+    dropped is attached as `suppressed` to the next record of that event
+    that gets through, so the totals can still be reconstructed.
+    """
+
+    def __init__(self, events, rate=LOG_EVENT_RATE):
+        super().__init__()
+        self.events = frozenset(events)
+        self.rate = rate
+        # event -> [second, records kept this second, records suppressed since last kept]
+        self.windows = {}
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event not in self.events:
+            return True
+        second = int(record.created)
+        with self.lock:
+            window = self.windows.get(event)
+            if window is None:
+                window = self.windows[event] = [second, 0, 0]
+            elif window[0] != second:
+                window[0] = second
+                window[1] = 0
+            if window[1] >= self.rate:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+            window[1] += 1
+            record.suppressed, window[2] = window[2], 0
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller.
+
+    Records are queued as-is and formatted on the listener thread, so the
+    message is only built for records that are actually written. When the
+    queue is full the record is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Logger whose records go through a bounded queue to a JSON writer thread."""
+
+    def __init__(self, name, sampled_events=(), event_rate=LOG_EVENT_RATE, queue_size=LOG_QUEUE_SIZE,
+                 stream=None, level=logging.INFO):
+        self.handler = DroppingQueueHandler(queue.Queue(queue_size))
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.handler.queue, writer)
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(level)
+        # On the logger rather than the handler, so suppressed records are
+        # dropped before any handler is looked up or locked
+        for existing in [f for f in self.logger.filters if isinstance(f, EventRateFilter)]:
+            self.logger.removeFilter(existing)
+        if sampled_events:
+            self.sampler = EventRateFilter(sampled_events, event_rate)
+            self.logger.addFilter(self.sampler)
+        else:
+            self.sampler = None
+        self.logger.handlers = [self.handler]
+        self.logger.propagate = False
+        self.running = False
+
+    def start(self):
+        if not self.running:
+            self.listener.start()
+            self.running = True
+
+    def stop(self):
+        # Flushes everything already queued before returning
+        if self.running:
+            self.listener.stop()
+            self.running = False
+
+    def stats(self):
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "suppressed": self.sampler.suppressed if self.sampler else 0
+        }
@@ -0,0 +1,145 @@
+import os
+import fcntl
+import shutil
+import subprocess
+
+import pytest
+
+import git_mirror
+from git_mirror import GitMirrorCache
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def commit(repo, content):
+    with open(os.path.join(repo, "app.py"), "w") as f:
+        f.write(content)
+    git(repo, "add", "app.py")
+    git(repo, "commit", "--quiet", "-m", content)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def source(tmp_path):
+    # A local repository served over file://, standing in for the remote
+    repo = tmp_path / "source"
+    repo.mkdir()
+    git(repo, "init", "--quiet", "--initial-branch=main")
+    first = commit(repo, "v1")
+    return repo, f"file://{repo}", first
+
+
+def read_app(worktree):
+    with open(os.path.join(worktree, "app.py")) as f:
+        return f.read()
+
+
+def test_clone_checkout_and_release(source, tmp_path):
+    _, url, first = source
+    cache = GitMirrorCache(str(tmp_path / "cache"))
+    worktree, resolved = cache.checkout(url)
+    assert resolved == first
+    assert read_app(worktree) == "v1"
+    assert os.path.isdir(cache.mirror_path(url))
+    cache.release(worktree)
+    assert not os.path.exists(worktree)
+
+
+def test_fetch_picks_up_new_commits(source, tmp_path):
+    repo, url, _ = source
+    cache = GitMirrorCache(str(tmp_path / "cache"), fetch_ttl=0)
+    worktree, _ = cache.checkout(url)
+    cache.release(worktree)
+    second = commit(repo, "v2")
+    worktree, resolved = cache.checkout(url, "main")
+    assert resolved == second
+    assert read_app(worktree) == "v2"
+    cache.release(worktree)
+
+
+def test_fetch_ttl_reuses_recent_mirror(source, tmp_path):
+    repo, url, first = source
+    cache = GitMirrorCache(str(tmp_path / "cache"), fetch_ttl=3600)
+    worktree, _ = cache.checkout(url)
+    cache.release(worktree)
+    commit(repo, "v2")
+    worktree, resolved = cache.checkout(url)
+    assert resolved == first
+    cache.release(worktree)
+
+
+def test_pinned_commit_checks_out_offline(source, tmp_path):
+    repo, url, first = source
+    cache = GitMirrorCache(str(tmp_path / "cache"), fetch_ttl=0)
+    worktree, _ = cache.checkout(url)
+    cache.release(worktree)
+    shutil.rmtree(repo)
+    # A full commit id already in the mirror needs no fetch
+    worktree, resolved = cache.checkout(url, first)
+    assert resolved == first
+    assert read_app(worktree) == "v1"
+    cache.release(worktree)
+    # A branch name does, and the remote is gone
+    with pytest.raises(subprocess.CalledProcessError):
+        cache.checkout(url, "main")
+
+
+def test_eviction_skips_mirrors_in_use(tmp_path):
+    urls = []
+    for name in ("one", "two"):
+        repo = tmp_path / name
+        repo.mkdir()
+        git(repo, "init", "--quiet", "--initial-branch=main")
+        commit(repo, name)
+        urls.append(f"file://{repo}")
+    cache = GitMirrorCache(str(tmp_path / "cache"), max_bytes=1)
+    worktree, _ = cache.checkout(urls[0])
+    cache.release(worktree)
+    # Over the limit: the idle first mirror goes, the one just checked out stays
+    worktree, _ = cache.checkout(urls[1])
+    assert not os.path.exists(cache.mirror_path(urls[0]))
+    assert os.path.isdir(cache.mirror_path(urls[1]))
+    assert read_app(worktree) == "two"
+    cache.release(worktree)
+    cache.evict()
+    assert not os.path.exists(cache.mirror_path(urls[1]))
+
+
+def test_release_holds_the_use_lock_until_the_worktree_is_gone(source, tmp_path, monkeypatch):
+    _, url, _ = source
+    cache = GitMirrorCache(str(tmp_path / "cache"))
+    worktree, _ = cache.checkout(url)
+    mirror = cache.mirror_path(url)
+    evictable = []
+    run_git = git_mirror._git
+
+    def checking_git(*args):
+        if "remove" in args:
+            # What evict() tries before deleting a mirror
+            with open(mirror + ".use", "a") as use_lock:
+                try:
+                    fcntl.flock(use_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    evictable.append(True)
+                except BlockingIOError:
+                    evictable.append(False)
+        return run_git(*args)
+
+    monkeypatch.setattr(git_mirror, "_git", checking_git)
+    cache.release(worktree)
+    assert evictable == [False]
+    assert not os.path.exists(worktree)
+
+
+def test_release_survives_a_missing_mirror(source, tmp_path):
+    _, url, _ = source
+    cache = GitMirrorCache(str(tmp_path / "cache"))
+    worktree, _ = cache.checkout(url)
+    # Both worktree remove and prune fail without the mirror
+    shutil.rmtree(cache.mirror_path(url))
+    cache.release(worktree)
+    assert not os.path.exists(worktree)
@@ -0,0 +1,215 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("modal")
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("websockets")
+
+import modal_container
+from modal_container import AdmissionControl
+
+ORIGIN = {"origin": "https://lightning.ai"}
+
+
+def test_admission_hands_slots_to_waiters_in_order():
+    async def main():
+        admission = AdmissionControl(limit=1, max_queue=2)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 5
+        assert await admission.acquire(deadline)
+        order = []
+
+        async def wait(name):
+            assert await admission.acquire(deadline)
+            order.append(name)
+
+        waiters = [asyncio.ensure_future(wait(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        # The queue is full, so a third waiter is shed right away
+        assert not await admission.acquire(deadline)
+        admission.release()
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*waiters)
+        admission.release()
+        return admission, order
+
+    admission, order = asyncio.run(main())
+    assert order == ["first", "second"]
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["rejected"] == 1
+
+
+def test_admission_times_out_and_leaves_the_queue():
+    async def main():
+        admission = AdmissionControl(limit=1, max_queue=1)
+        loop = asyncio.get_running_loop()
+        assert await admission.acquire(loop.time() + 5)
+        assert not await admission.acquire(loop.time() + 0.01)
+        admission.release()
+        return admission
+
+    admission = asyncio.run(main())
+    assert admission.stats()["timed_out"] == 1
+    assert admission.stats()["waiting"] == 0
+    assert admission.stats()["active"] == 0
+
+
+async def truncated_body(reader, writer):
+    # Announces a body far longer than it sends, then closes the connection
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n" + b"x" * 100)
+
+
+async def redirect_then_echo(reader, writer):
+    # /old answers 307 to an absolute /new on this backend, which echoes the body
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    path = head.split(" ")[1]
+    length = 0
+    for line in head.split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    if path == "/old":
+        port = writer.get_extra_info("sockname")[1]
+        writer.write(
+            f"HTTP/1.1 307 Temporary Redirect\r\nLocation: http://localhost:{port}/new\r\n"
+            "Content-Length: 0\r\n\r\n".encode()
+        )
+    else:
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+
+
+@pytest.fixture
+def proxy(monkeypatch):
+    # The web_app FastAPI app against an in-process backend instead of a
+    # galaxybackend process; backend(reader, writer) answers one request per connection
+    def run(main, backend=truncated_body):
+        async def handle(reader, writer):
+            try:
+                await backend(reader, writer)
+                await writer.drain()
+            except (asyncio.IncompleteReadError, OSError):
+                pass
+            writer.close()
+
+        async def with_proxy():
+            server = await asyncio.start_server(handle, "localhost", 0)
+            monkeypatch.setattr(modal_container, "PROXY_BACKEND_BASE_PORT", server.sockets[0].getsockname()[1])
+            monkeypatch.setattr(modal_container, "PROXY_BACKEND_WORKERS", 1)
+            monkeypatch.setattr(modal_container, "PROXY_MAX_CONCURRENT", 2)
+            monkeypatch.setattr(modal_container, "PROXY_QUEUE_DEADLINE", 1.0)
+            monkeypatch.setattr(modal_container.BackendWorker, "supervise", lambda worker: setattr(worker, "running", True))
+            fastapp = modal_container.create_web_app()
+            try:
+                async with fastapp.router.lifespan_context(fastapp):
+                    return await main(fastapp)
+            finally:
+                server.close()
+                await server.wait_closed()
+        return asyncio.run(with_proxy())
+    return run
+
+
+async def proxy_status(fastapp):
+    transport = httpx.ASGITransport(app=fastapp)
+    async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+        return (await client.get("/status", headers=ORIGIN)).json()
+
+
+async def wait_until_ready(fastapp):
+    for _ in range(100):
+        if (await proxy_status(fastapp))["container_port_open"]:
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("backend never became ready")
+
+
+def test_admission_released_when_upstream_body_fails(proxy):
+    async def main(fastapp):
+        await wait_until_ready(fastapp)
+        transport = httpx.ASGITransport(app=fastapp)
+        async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            # More requests than slots: each must release its slot when the body breaks
+            for _ in range(5):
+                try:
+                    response = await client.get("/item", headers=ORIGIN)
+                    assert response.status_code != 503
+                except httpx.HTTPError:
+                    pass
+        return await proxy_status(fastapp)
+
+    status = proxy(main)
+    assert status["admission"]["active"] == 0
+    assert status["admission"]["timed_out"] == 0
+    assert status["health"]["workers"][0]["active"] == 0
+    assert status["upstream_pool"]["waiting"] == 0
+
+
+def test_admission_released_when_client_disconnects(proxy):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/item", "raw_path": b"/item", "query_string": b"",
+        "root_path": "", "headers": [(b"origin", ORIGIN["origin"].encode()), (b"host", b"proxy")],
+        "client": ("127.0.0.1", 50000), "server": ("proxy", 80)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        # ASGI 2.4 servers raise OSError once the client has gone
+        if message["type"] == "http.response.start" and message["status"] == 200:
+            raise OSError("client went away")
+
+    async def main(fastapp):
+        await wait_until_ready(fastapp)
+        for _ in range(5):
+            try:
+                await fastapp(dict(scope), receive, send)
+            except Exception:
+                pass
+        return await proxy_status(fastapp)
+
+    status = proxy(main)
+    assert status["admission"]["active"] == 0
+    assert status["admission"]["timed_out"] == 0
+    assert status["health"]["workers"][0]["active"] == 0
+
+
+def test_redirects_with_a_request_body(proxy, monkeypatch):
+    monkeypatch.setattr(modal_container, "PROXY_REPLAY_BODY_BYTES", 1024)
+
+    async def main(fastapp):
+        await wait_until_ready(fastapp)
+        transport = httpx.ASGITransport(app=fastapp)
+        async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            # Small enough to be read first, so the proxy follows the 307 itself
+            followed = await client.post("/old", content=b"small", headers=ORIGIN)
+            # Streamed: the redirect goes back to the client, pointing at the proxy
+            relayed = await client.post("/old", content=b"x" * 4096, headers=ORIGIN)
+        return followed, relayed
+
+    followed, relayed = proxy(main, backend=redirect_then_echo)
+    assert followed.status_code == 200
+    assert followed.content == b"small"
+    assert relayed.status_code == 307
+    assert relayed.headers["location"] == "/new"
+
+
+def test_metrics_token_with_non_ascii_authorization(proxy, monkeypatch):
+    monkeypatch.setattr(modal_container, "PROXY_METRICS_TOKEN", "secret")
+
+    async def main(fastapp):
+        transport = httpx.ASGITransport(app=fastapp)
+        async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            garbled = await client.get("/metrics", headers={"authorization": "Bearer caf\xe9".encode("latin-1")})
+            token = await client.get("/metrics", headers={"authorization": "Bearer secret"})
+        return garbled, token
+
+    garbled, token = proxy(main)
+    assert garbled.status_code == 403
+    assert token.status_code == 200
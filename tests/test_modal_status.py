@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import threading
+
+from modal_backend import CliBackend, FakeBackend
+from modal_status import ModalStatusCache
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_modal_cli.py")
+
+
+class ListingBackend(FakeBackend):
+    # Answers `app list --json` with fixed rows, as modal does for repeated names
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+
+    def list(self):
+        return 0, json.dumps(self.rows), ""
+
+
+def test_lookups_are_cached_until_invalidated():
+    backend = FakeBackend()
+    backend.apps["app"] = "deployed"
+    cache = ModalStatusCache(backend, ttl=60, list_interval=0)
+    assert cache.lookup("app")["status"] == "deployed"
+    backend.apps.clear()
+    assert cache.lookup("app")["status"] == "deployed"
+    cache.invalidate("app")
+    assert cache.lookup("app")["status"] == "unknown"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["backend_calls"]) == (1, 2, 2)
+
+
+def test_concurrent_lookups_share_one_backend_call():
+    release = threading.Event()
+
+    class SlowBackend(FakeBackend):
+        def show(self, modal_name):
+            release.wait(5)
+            return super().show(modal_name)
+
+    backend = SlowBackend()
+    backend.apps["app"] = "deployed"
+    cache = ModalStatusCache(backend, ttl=60, list_interval=0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.lookup("app"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert [result["status"] for result in results] == ["deployed"] * 5
+    assert cache.stats()["backend_calls"] == 1
+
+
+def test_bulk_refresh_answers_lookups():
+    backend = FakeBackend()
+    backend.apps.update({"one": "deployed", "two": "stopped"})
+    cache = ModalStatusCache(backend, ttl=60, list_interval=60)
+    assert cache.refresh_all()
+    assert cache.lookup("one")["status"] == "deployed"
+    assert cache.lookup("two")["status"] == "unknown"
+    # Not in a fresh listing: answered without asking modal
+    assert cache.lookup("three")["details"] == "App not found in modal app list"
+    assert cache.stats()["backend_calls"] == 1
+
+
+def test_bulk_refresh_prefers_a_deployed_row():
+    rows = [
+        {"Description": "app", "State": "deployed"},
+        {"Description": "app", "State": "stopped"},
+        {"Description": "other", "State": "stopped"},
+        {"Description": "other", "State": "deployed"}
+    ]
+    cache = ModalStatusCache(ListingBackend(rows), ttl=60, list_interval=60)
+    assert cache.refresh_all()
+    assert cache.lookup("app")["status"] == "deployed"
+    assert cache.lookup("other")["status"] == "deployed"
+
+
+def test_bulk_refresh_errors_are_counted():
+    class BrokenBackend(FakeBackend):
+        def list(self):
+            return 0, "not json", ""
+
+    cache = ModalStatusCache(BrokenBackend(), list_interval=60)
+    assert not cache.refresh_all()
+    assert cache.stats()["bulk_errors"] == 1
+
+
+def test_cli_backend_with_the_fake_cli(tmp_path, monkeypatch):
+    # MODAL_CLI can point at benchmarks/fake_modal_cli.py instead of modal
+    monkeypatch.setenv("FAKE_MODAL_STATE", str(tmp_path / "state.json"))
+    backend = CliBackend(command=[sys.executable, FAKE_CLI])
+    cache = ModalStatusCache(backend, ttl=60, list_interval=60)
+    lines = []
+    returncode, _, _ = backend.deploy("app", str(tmp_path), on_line=lines.append, env=dict(os.environ, MODAL_APP_NAME="app"))
+    assert returncode == 0
+    assert lines[-1] == "App deployed!"
+    assert cache.refresh_all()
+    assert cache.lookup("app")["status"] == "deployed"
+    assert backend.stop("app")[0] == 0
+    cache.invalidate("app")
+    assert cache.refresh_all()
+    assert cache.lookup("app")["status"] == "unknown"
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from performance_profiles import (
+    DEFAULT_PROFILE, PROFILE_ENV, PROFILES, function_options, load_profiles, profile_env,
+    profile_from_env, resolve_profile, validate_profile
+)
+
+
+def test_builtin_profiles_are_valid():
+    profiles = load_profiles("")
+    assert set(profiles) == set(PROFILES)
+    for name, profile in profiles.items():
+        assert profile["name"] == name
+
+
+def test_extra_profiles_default_to_standard_settings():
+    profiles = load_profiles(json.dumps({"big": {"cpu": 4, "memory": 8192}}))
+    assert profiles["big"]["cpu"] == 4
+    assert profiles["big"]["memory"] == 8192
+    assert profiles["big"]["max_containers"] == PROFILES[DEFAULT_PROFILE]["max_containers"]
+
+
+def test_invalid_extra_profile_is_rejected():
+    with pytest.raises(ValueError, match="'huge'.*cpu must be between"):
+        load_profiles(json.dumps({"huge": {"cpu": 1000}}))
+
+
+@pytest.mark.parametrize("settings, message", [
+    ({"gpu": "a100"}, "unknown settings: gpu"),
+    ({"cpu": None}, "cpu is required"),
+    ({"cpu": "2"}, "cpu must be a number"),
+    ({"min_containers": True}, "min_containers must be a number"),
+    ({"memory": 1024.5}, "memory must be a whole number"),
+    ({"scaledown_window": 1}, "scaledown_window must be between 2 and 1200"),
+    ({"min_containers": 3, "max_containers": 2}, "max_containers must be at least min_containers"),
+    ({"target_inputs": 10}, "target_inputs needs max_inputs"),
+    ({"max_inputs": 10, "target_inputs": 20}, "target_inputs must not exceed max_inputs"),
+])
+def test_validate_profile_errors(settings, message):
+    with pytest.raises(ValueError, match=message):
+        validate_profile(dict(PROFILES[DEFAULT_PROFILE], **settings), "bad")
+
+
+def test_validate_profile_reports_every_problem():
+    with pytest.raises(ValueError) as error:
+        validate_profile({"cpu": 0, "memory": 10, "min_containers": 0, "max_containers": 1}, "bad")
+    assert "cpu must be between" in str(error.value)
+    assert "memory must be between" in str(error.value)
+
+
+def test_validate_profile_normalizes_whole_numbers():
+    profile = validate_profile(dict(PROFILES[DEFAULT_PROFILE], memory=4096.0), "custom")
+    assert profile["memory"] == 4096
+    assert isinstance(profile["memory"], int)
+    assert profile["name"] == "custom"
+
+
+def test_resolve_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown performance profile 'turbo'"):
+        resolve_profile("turbo", load_profiles(""))
+
+
+def test_profile_from_env():
+    assert profile_from_env({})["name"] == DEFAULT_PROFILE
+    assert profile_from_env({PROFILE_ENV: "peak"}) == resolve_profile("peak", PROFILES)
+    custom = dict(resolve_profile("economy", PROFILES), name="custom", cpu=1.0)
+    assert profile_from_env(profile_env(custom)) == custom
+
+
+def test_function_options_standard():
+    function_kwargs, concurrent_kwargs = function_options(resolve_profile("standard", PROFILES))
+    assert function_kwargs == {"cpu": 1.5, "memory": 2048, "min_containers": 1, "max_containers": 1}
+    assert concurrent_kwargs is None
+
+
+def test_function_options_with_input_concurrency():
+    function_kwargs, concurrent_kwargs = function_options(resolve_profile("peak", PROFILES))
+    assert function_kwargs["scaledown_window"] == 600
+    assert function_kwargs["max_containers"] == 4
+    assert concurrent_kwargs == {"max_inputs": 200, "target_inputs": 100}
+    _, concurrent_kwargs = function_options(resolve_profile("economy", PROFILES))
+    assert concurrent_kwargs == {"max_inputs": 64}
@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+
+import pytest
+
+import rate_limit
+from rate_limit import MemoryRateLimitStore, RateLimiter, SqliteRateLimitStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryRateLimitStore()
+    return SqliteRateLimitStore(str(tmp_path / "limits.db"))
+
+
+def test_limit_within_a_window(store):
+    results = [store.hit("client", 3, 60, now=120.0) for _ in range(4)]
+    assert results[:3] == [(True, 0)] * 3
+    allowed, retry_after = results[3]
+    assert not allowed
+    assert retry_after == 60
+
+
+def test_previous_window_is_weighted(store):
+    for _ in range(4):
+        store.hit("client", 4, 60, now=0.0)
+    # Half way into the next window half of the previous count still applies
+    assert store.hit("client", 4, 60, now=90.0) == (True, 0)
+    assert store.hit("client", 4, 60, now=90.0) == (True, 0)
+    assert not store.hit("client", 4, 60, now=90.0)[0]
+    # Two windows later the counters are back to zero
+    assert store.hit("client", 4, 60, now=180.0) == (True, 0)
+
+
+def test_keys_are_counted_separately(store):
+    assert store.hit("a", 1, 60, now=0.0)[0]
+    assert not store.hit("a", 1, 60, now=0.0)[0]
+    assert store.hit("b", 1, 60, now=0.0)[0]
+
+
+def test_memory_store_is_bounded_and_evicts_idle_keys():
+    store = MemoryRateLimitStore(max_clients=2)
+    for client in ("a", "b", "c"):
+        store.hit(client, 5, 60, now=0.0)
+    assert len(store) == 2
+    assert "a" not in store.counters
+    # Idle for two full windows: dropped on the next hit
+    store.hit("d", 5, 60, now=200.0)
+    assert list(store.counters) == ["d"]
+
+
+def test_route_limits_use_the_longest_prefix():
+    limiter = RateLimiter(
+        requests_limit=100, time_window=60,
+        route_limits={"/api/": [5, 60], "/api/deploy": [1, 60]}
+    )
+    assert limiter.check("1.2.3.4", "/api/deploy")[0]
+    assert not limiter.check("1.2.3.4", "/api/deploy")[0]
+    # Other /api/ paths have their own, larger budget
+    assert all(limiter.check("1.2.3.4", "/api/status")[0] for _ in range(5))
+    assert not limiter.check("1.2.3.4", "/api/jobs")[0]
+    assert limiter.check("1.2.3.4", "/")[0]
+
+
+def test_sqlite_limits_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first, second = SqliteRateLimitStore(path), SqliteRateLimitStore(path)
+    assert first.hit("client", 2, 60, now=0.0)[0]
+    assert second.hit("client", 2, 60, now=0.0)[0]
+    assert not first.hit("client", 2, 60, now=0.0)[0]
+
+
+def test_sqlite_store_fails_open_while_locked(tmp_path):
+    path = str(tmp_path / "limits.db")
+    store = SqliteRateLimitStore(path, busy_timeout=0.001)
+    store.hit("client", 1, 60, now=0.0)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert store.hit("client", 1, 60, now=0.0) == (True, 0)
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert store.fail_open_count == 1
+    assert not store.hit("client", 1, 60, now=0.0)[0]
+
+
+def test_sqlite_store_fails_open_when_connecting_fails(tmp_path, monkeypatch):
+    store = SqliteRateLimitStore(str(tmp_path / "limits.db"))
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(rate_limit, "thread_connection", locked)
+    # A thread without a connection yet has to open one
+    results = []
+    thread = threading.Thread(target=lambda: results.append(store.hit("client", 1, 60, now=0.0)))
+    thread.start()
+    thread.join()
+    assert results == [(True, 0)]
+    assert store.fail_open_count == 1
@@ -0,0 +1,76 @@
+import asyncio
+
+from response_cache import CachedResponse, ResponseCache, etag_matches
+
+
+def entry(body=b"body", headers=None, ttl=60, vary=()):
+    return CachedResponse(200, headers or {"content-type": "text/plain"}, body, ttl, vary=vary)
+
+
+def test_rules_match_longest_prefix():
+    cache = ResponseCache({"/static/": 3600, "/static/live/": 5})
+    assert cache.ttl_for("/static/app.js") == 3600
+    assert cache.ttl_for("/static/live/feed") == 5
+    assert cache.ttl_for("/api/state") is None
+
+
+def test_freshness_honours_upstream_directives():
+    cache = ResponseCache()
+    assert cache.freshness(200, {}, 60) == 60
+    assert cache.freshness(200, {"cache-control": "max-age=10"}, 60) == 10
+    assert cache.freshness(200, {"cache-control": "max-age=600"}, 60) == 60
+    assert cache.freshness(200, {"cache-control": "private"}, 60) is None
+    assert cache.freshness(200, {"set-cookie": "a=b"}, 60) is None
+    assert cache.freshness(200, {"vary": "*"}, 60) is None
+    assert cache.freshness(404, {}, 60) is None
+
+
+def test_get_put_and_vary():
+    cache = ResponseCache()
+    base = cache.base_key("/config", [])
+    cache.put(base, {"accept-language": "en"}, entry(b"en", vary=("accept-language",)))
+    assert cache.get(base, {"accept-language": "en"}).body == b"en"
+    assert cache.get(base, {"accept-language": "de"}) is None
+    assert cache.get(base, {"accept-language": "en", "cache-control": "no-cache"}) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_bounded_by_total_bytes():
+    size = entry(b"x" * 100).size
+    cache = ResponseCache(max_bytes=size * 2)
+    for path in ("/a", "/b"):
+        cache.put(cache.base_key(path, []), {}, entry(b"x" * 100))
+    cache.get(cache.base_key("/a", []), {})
+    cache.put(cache.base_key("/c", []), {}, entry(b"x" * 100))
+    assert cache.get(cache.base_key("/b", []), {}) is None
+    assert cache.get(cache.base_key("/a", []), {}) is not None
+    assert cache.evictions == 1
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_entries_get_a_validator():
+    cached = entry()
+    assert cached.etag.startswith('W/"')
+    assert etag_matches(cached.etag, cached.etag)
+    assert etag_matches("*", cached.etag)
+    assert not etag_matches('"other"', cached.etag)
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ResponseCache()
+    base = cache.base_key("/slow", [])
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return entry(b"slow"), None
+
+    async def main():
+        return await asyncio.gather(*(cache.fetch(base, {}, fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert cache.coalesced == 4
+    assert all(cached.body == b"slow" for cached, _ in results)
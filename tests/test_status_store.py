@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from status_store import CachedStatusStore, MemoryStatusStore, SqliteStatusStore, StatusStore, create_status_store
+
+
+@pytest.fixture(params=["memory", "sqlite", "cached"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStatusStore()
+    if request.param == "sqlite":
+        return SqliteStatusStore(str(tmp_path / "status.db"))
+    return CachedStatusStore(SqliteStatusStore(str(tmp_path / "status.db")), ttl=60)
+
+
+def test_incomplete_store_fails_at_creation():
+    class GetOnly(StatusStore):
+        def get(self, modal_name, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_dict_interface(store):
+    assert store.get("app") is None
+    assert store.get("app", {"status": "unknown"}) == {"status": "unknown"}
+    assert "app" not in store
+    with pytest.raises(KeyError):
+        store["app"]
+    store["app"] = {"status": "deployed", "details": "ok"}
+    assert "app" in store
+    assert store["app"] == {"status": "deployed", "details": "ok"}
+
+
+def test_history_is_newest_first(store):
+    for status in ("in_progress", "deployed", "undeployed"):
+        store.set("app", {"status": status})
+        time.sleep(0.001)
+    store.set("other", {"status": "deployed"})
+    history = store.history("app")
+    assert [entry["status"] for entry in history] == ["undeployed", "deployed", "in_progress"]
+    assert all("recorded_at" in entry for entry in history)
+    assert len(store.history("app", limit=1)) == 1
+
+
+def test_list_filters_by_status(store):
+    store.set("one", {"status": "deployed"})
+    time.sleep(0.001)
+    store.set("two", {"status": "failed"})
+    time.sleep(0.001)
+    store.set("three", {"status": "deployed"})
+    assert [entry["modal_name"] for entry in store.list()] == ["three", "two", "one"]
+    assert [entry["modal_name"] for entry in store.list(status="deployed")] == ["three", "one"]
+    assert len(store.list(limit=2)) == 2
+
+
+def test_prune_keeps_current_status(store):
+    store.set("app", {"status": "in_progress"})
+    store.set("app", {"status": "deployed"})
+    assert store.prune(older_than=-1) == 2
+    assert store.history("app") == []
+    assert store["app"]["status"] == "deployed"
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "status.db")
+    SqliteStatusStore(path).set("app", {"status": "deployed"})
+    assert SqliteStatusStore(path)["app"]["status"] == "deployed"
+
+
+def test_cached_store_sees_other_writers_after_ttl(tmp_path):
+    path = str(tmp_path / "status.db")
+    cached = CachedStatusStore(SqliteStatusStore(path), ttl=0.05)
+    cached.set("app", {"status": "in_progress"})
+    assert cached["app"]["status"] == "in_progress"
+    # Another worker process writing to the same file
+    SqliteStatusStore(path).set("app", {"status": "deployed"})
+    assert cached["app"]["status"] == "in_progress"
+    time.sleep(0.06)
+    assert cached["app"]["status"] == "deployed"
+
+
+def test_cache_is_bounded():
+    cached = CachedStatusStore(MemoryStatusStore(), max_entries=2)
+    for name in ("a", "b", "c"):
+        cached.get(name)
+    assert list(cached.cache) == ["b", "c"]
+
+
+def test_unknown_store_kind():
+    assert isinstance(create_status_store("memory"), MemoryStatusStore)
+    with pytest.raises(ValueError):
+        create_status_store("redis")